@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import signal
 import sys
 from pathlib import Path
 from aiogram import types
@@ -7,10 +8,18 @@ from aiogram import types
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 from config import settings
 from middlewares.database import DataBaseSessionMiddleware
-from middlewares.rate_limiter import RateLimiterMiddleware
+from middlewares.metrics import ApiMetricsMiddleware, MetricsMiddleware
+from middlewares.rate_limiter import RateLimiterMiddleware, SessionRateLimiter
+from middlewares.sql_stats import SqlStatsMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from services.broadcast import BroadcastService
+from services.broadcast_shards import BroadcastShardService
+from utils.task_supervisor import InFlightMiddleware, supervisor
 from handlers import start, admin, admin_promos, admin_channels, admin_broadcast, admin_users, admin_gift, admin_balance, admin_activity, admin_stars, system_stats, gift_payout, ton_requests, gift_promos, transactions, admin_user, stars_payment, lottery, stars_stat, admin_subs, admin_mine, mines, cups
 
 
@@ -22,15 +31,50 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def on_startup(bot: Bot):
+    # Продолжаем рассылки, прерванные прошлым рестартом — одним процессом,
+    # а не каждым воркером потока апдейтов
+    if settings.run_mode != "stream_worker" or settings.stream_worker_index == 0:
+        await BroadcastService.resume_unfinished(bot)
+
+    # Воркер шардированных рассылок есть в каждом процессе
+    if settings.broadcast_sharded:
+        supervisor.spawn(BroadcastShardService.run_worker(bot), name="broadcast-shards")
+
+
 async def main():
+    session = None
+    if settings.bot_api_url:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.bot_api_url))
     bot = Bot(
         token=settings.bot_token,
+        session=session,
     )
+    # Лимиты Bot API на каждый запрос бота
+    bot.session.middleware(SessionRateLimiter())
+    # Время самих запросов к Bot API — после лимитов
+    bot.session.middleware(ApiMetricsMiddleware())
     dp = Dispatcher()
-
+    dp.startup.register(on_startup)
+
+    # Апдейты в обработке — чтобы при остановке их дождаться
+    dp.update.middleware(InFlightMiddleware())
+    # Антифлуд — до того, как под апдейт откроется сессия БД
+    dp.update.middleware(ThrottlingMiddleware())
+    # Учёт SQL по апдейтам и обработчикам
+    sql_stats = SqlStatsMiddleware()
+    dp.update.middleware(sql_stats)
+    dp.message.middleware(sql_stats)
+    dp.callback_query.middleware(sql_stats)
+    dp.pre_checkout_query.middleware(sql_stats)
+    # Задержка, ошибки, время в БД и Bot API по обработчикам — внутри учёта SQL
+    metrics = MetricsMiddleware()
+    dp.message.middleware(metrics)
+    dp.callback_query.middleware(metrics)
+    dp.pre_checkout_query.middleware(metrics)
     # Middleware для сессии
     dp.update.middleware(DataBaseSessionMiddleware())
-    dp.update.middleware(RateLimiterMiddleware(rate=30, time_period=1))
+    dp.update.middleware(RateLimiterMiddleware())
 
     # Роутеры
     dp.include_router(start.router)
@@ -63,12 +107,48 @@ async def main():
 
 
 
+    # При остановке рассылки сохраняют курсор и выходят на границе чанка
+    supervisor.on_stop(BroadcastService.checkpoint_all)
+    supervisor.on_stop(BroadcastShardService.checkpoint_all)
+
+    # Polling сам ловит SIGTERM/SIGINT; вебхуку и потоку — ставим сами
+    if settings.run_mode != "polling":
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, supervisor.stop)
+            except NotImplementedError:  # Windows
+                pass
+
+    metrics_runner = None
+    if settings.metrics_port:
+        from utils.metrics import start_metrics_server
+
+        metrics_runner = await start_metrics_server()
+
     logger.info("🚀 Бот запускается...")
 
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if settings.run_mode == "webhook":
+            # aiohttp.web нужен только в режиме вебхука
+            from utils.webhook import run_webhook
+
+            await run_webhook(dp, bot)
+        elif settings.run_mode == "stream_receiver":
+            from utils.update_stream import run_stream_receiver
+
+            await run_stream_receiver(dp, bot)
+        elif settings.run_mode == "stream_worker":
+            from utils.update_stream import run_stream_worker
+
+            await run_stream_worker(dp, bot)
+        else:
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
         logger.info("🛑 Остановка бота...")
+        await supervisor.shutdown(settings.shutdown_timeout)
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
         await bot.session.close()
         logger.info("✅ Сессия закрыта")
 
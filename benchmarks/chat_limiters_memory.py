@@ -0,0 +1,86 @@
+"""
+Память под лимитеры чатов после рассылки на 1M получателей:
+прежний defaultdict (по AsyncLimiter на каждый chat_id навсегда)
+против TTLCache из RateLimiterMiddleware. Сеть не трогаем — только
+обращаемся к лимитеру каждого получателя, как это делает обёртка send_*.
+
+Меряем резидентную память процесса (RSS): каждый вариант — в отдельном
+процессе, потому что освобождённую память Python ОС обратно не отдаёт.
+«Прирост» — RSS после прогона минус RSS до него, «пик» — ru_maxrss.
+
+    python -m benchmarks.chat_limiters_memory
+"""
+import argparse
+import gc
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from aiolimiter import AsyncLimiter
+
+from utils.ttl_cache import TTLCache
+
+RECIPIENTS = 1_000_000
+MAXSIZE = 10_000
+TTL = 600
+
+VARIANTS = {
+    "defaultdict": lambda: defaultdict(lambda: AsyncLimiter(1, 1)),
+    "TTLCache": lambda: TTLCache(lambda: AsyncLimiter(1, 1), maxsize=MAXSIZE, ttl=TTL),
+}
+
+
+def rss_bytes() -> int:
+    """Текущий RSS; без /proc (не Linux) — пиковый из getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдаёт килобайты, macOS — байты
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run(name: str):
+    gc.collect()
+    before = rss_bytes()
+    limiters = VARIANTS[name]()
+
+    started = time.perf_counter()
+    for chat_id in range(1, RECIPIENTS + 1):
+        limiters[chat_id]
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    after = rss_bytes()
+    print(
+        f"{name:<12} объектов: {len(limiters):>9,}  "
+        f"RSS прирост: {(after - before) / 2**20:8.1f} МБ  пик: {peak_rss_bytes() / 2**20:8.1f} МБ  "
+        f"{elapsed / RECIPIENTS * 1e6:.2f} мкс/обращение"
+    )
+
+
+def main():
+    print(f"Получателей: {RECIPIENTS:,}, TTLCache maxsize={MAXSIZE:,} ttl={TTL}с")
+    for name in VARIANTS:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.chat_limiters_memory", "--variant", name],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--variant", choices=VARIANTS)
+    args = parser.parse_args()
+    if args.variant:
+        run(args.variant)
+    else:
+        main()
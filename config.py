@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,6 +8,65 @@ class Settings(BaseSettings):
     db_dsn: str
     admins: list[int] = []
     bot_href: str
+    bot_api_url: str | None = None  # свой Bot API сервер (локальный telegram-bot-api, стенды)
+
+    # Получение апдейтов: "polling", "webhook" или через Redis stream —
+    # один "stream_receiver" и несколько "stream_worker"
+    run_mode: Literal["polling", "webhook", "stream_receiver", "stream_worker"] = "polling"
+    webhook_url: str | None = None  # публичный адрес; без него set_webhook не вызываем
+    webhook_path: str = "/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_secret: str | None = None  # X-Telegram-Bot-Api-Secret-Token
+    webhook_max_connections: int = 40  # одновременных запросов от Telegram
+    webhook_max_in_flight: int = 200  # апдейтов в обработке, дальше — ждём
+
+    # Redis stream апдейтов: разделы по пользователю, раздел читает один воркер
+    stream_prefix: str = "updates"
+    stream_partitions: int = 64  # не меньше числа воркеров; менять только при остановленных воркерах
+    stream_maxlen: int = 100000  # примерный предел длины раздела
+    stream_workers: int = 1  # сколько всего воркеров
+    stream_worker_index: int = 0  # номер этого воркера, 0..stream_workers-1
+    shutdown_timeout: int = 20  # секунд на доработку апдейтов и задач при остановке
+
+    # Эндпоинт /metrics для Prometheus; без порта выключен
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int | None = None
+
+    # Пул соединений БД
+    db_pool_size: int = 10  # постоянных соединений
+    db_max_overflow: int = 20  # сверх pool_size под пиковую нагрузку
+    db_pool_timeout: int = 30  # секунд ждём свободное соединение
+    db_pool_recycle: int = 1800  # секунд живёт соединение до переоткрытия
+    db_pool_pre_ping: bool = True  # проверять соединение перед выдачей
+    db_replica_dsn: str | None = None  # реплика для админской аналитики; без неё читаем с primary
+    sql_n_plus_one_threshold: int = 5  # столько одинаковых запросов за апдейт — это N+1
+
+    # Рассылки
+    broadcast_concurrency: int = 20  # одновременных отправок
+    broadcast_rate: int = 25  # потолок сообщений в секунду на всю рассылку
+    broadcast_min_rate: int = 1  # ниже не опускаемся при флуд-лимитах
+    broadcast_progress_interval: int = 15  # секунд между правками статуса у админа
+    broadcast_fast_path: bool = True  # тела запросов сериализуются один раз на рассылку
+
+    # Шардирование рассылок между процессами через аренду чанков в БД
+    broadcast_sharded: bool = False
+    broadcast_chunk_size: int = 10000  # получателей в одном чанке
+    broadcast_lease_seconds: int = 60  # срок аренды чанка без продления
+
+    redis_url: str = "redis://127.0.0.1:6379"
+
+    # Лимиты исходящих запросов к Bot API
+    bot_global_rate: int = 30  # сообщений в секунду на бота, общий для всех процессов
+    chat_limiter_maxsize: int = 10000  # столько чатов держим в памяти одновременно
+    chat_limiter_ttl: int = 600  # секунд простоя, после которых лимитер чата выбрасывается
+
+    # Антифлуд входящих апдейтов: группа → (апдейтов, за сколько секунд)
+    throttle_windows: dict[str, tuple[int, float]] = {
+        "command": (5, 10),
+        "callback": (10, 5),
+        "message": (20, 10),
+    }
 
     class Config:
         env_file = ".env"
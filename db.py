@@ -1,11 +1,38 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from config import settings
+from utils.pool_metrics import MeteredPool
+
+
+def make_engine(dsn: str):
+    return create_async_engine(
+        dsn,
+        echo=False,
+        future=True,
+        poolclass=MeteredPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
 
 # Создаём движок и фабрику сессий
-engine = create_async_engine(settings.db_dsn, echo=False, future=True)
+engine = make_engine(settings.db_dsn)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
+# Сессии только для чтения — тяжёлая админская аналитика.
+# С db_replica_dsn ходят в реплику со своим пулом и не отнимают
+# соединения у оплат и игр; без неё — в primary. Транзакции read only,
+# так что запись через ReadSessionLocal упадёт, а не уйдёт не туда
+replica_engine = make_engine(settings.db_replica_dsn) if settings.db_replica_dsn else engine
+ReadSessionLocal = async_sessionmaker(
+    replica_engine.execution_options(postgresql_readonly=True),
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
 
 # Базовый класс для моделей
 class Base(DeclarativeBase):
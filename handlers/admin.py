@@ -3,6 +3,7 @@ from aiogram.filters import Command
 from aiogram.types import Message
 
 from config import settings
+from db import ReadSessionLocal
 from services.stats import send_admin_stats
 from utils.keyboards import broadcast_main_kb
 
@@ -12,11 +13,12 @@ router = Router()
 
 
 @router.message(Command("stats"))
-async def cmd_stats(message: Message, bot: Bot, session):
+async def cmd_stats(message: Message, bot: Bot):
     """Панель с общей информацией о системе"""
     if message.from_user.id not in settings.admins:
         return
-    await send_admin_stats(message, bot, session)
+    async with ReadSessionLocal() as session:
+        await send_admin_stats(message, bot, session)
 
 
 @router.message(Command("broadcast"))
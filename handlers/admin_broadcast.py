@@ -9,6 +9,7 @@ from aiogram.types import MessageEntity
 
 from db import SessionLocal
 from services.broadcast import BroadcastService
+from services.segments import SegmentService, SEGMENT_PRESETS
 from states.broadcast_states import BroadcastStates
 from utils.keyboards import (
     broadcast_main_kb,
@@ -17,12 +18,14 @@ from utils.keyboards import (
     button_type_kb,
     broadcast_active_kb,
     broadcast_control_kb,
+    broadcast_segment_kb,
 )
 
 from models.broadcast_task import BroadcastTask
 from datetime import datetime, timedelta, timezone
 
 from utils.broadcast_formatting import progress_bar, format_time_delta, decline_word
+from utils.task_supervisor import supervisor
 
 router = Router()
 
@@ -115,15 +118,91 @@ CASE_EMOJIS = {
 
 
 
+# Сколько ждём следующую часть пересланного альбома, прежде чем считать его целым
+ALBUM_DEBOUNCE = 1.0
+
+# Отложенное завершение пересланного альбома по user_id админа
+album_finalizers: dict[int, asyncio.Task] = {}
+
+
 @router.message(BroadcastStates.waiting_forward, F.forward_origin | F.forward_from | F.forward_from_chat)
 async def process_forwarded_message(message: Message, state: FSMContext):
-    """Обработка пересланного сообщения (текст, фото, видео, видео-кружок)"""
+    """
+    Обработка пересланного сообщения.
+    Пост рассылается через copy_message из этого чата, поэтому форматирование,
+    альбомы и кастомные эмодзи сохраняются как есть. Текст и медиа всё равно
+    разбираем — для предпросмотра и на случай ручного редактирования.
+    """
     user_id = message.from_user.id
 
 
     draft = BroadcastService.current_editing[user_id]
 
-    # Извлекаем текст/подпись и entities
+    if message.media_group_id:
+        # Альбом приходит несколькими сообщениями: части копим в данных FSM,
+        # а предпросмотр отправляет отложенная задача, когда альбом затихнет.
+        # Обработчик не ждёт сам — апдейты могут идти строго по одному
+        data = await state.get_data()
+        if data.get("forward_album_id") == message.media_group_id:
+            message_ids = [*data["forward_album_ids"], message.message_id]
+            # Подпись альбома может быть у любой части
+            if message.caption:
+                _apply_forwarded_text(draft, message)
+        else:
+            message_ids = [message.message_id]
+            _apply_forwarded_text(draft, message)
+            _apply_forwarded_media(draft, message)
+
+        await state.update_data(
+            forward_album_id=message.media_group_id,
+            forward_album_ids=message_ids,
+        )
+        previous = album_finalizers.pop(user_id, None)
+        if previous:
+            previous.cancel()
+        finalizer = supervisor.spawn(
+            _finish_forwarded_album(message, state, draft), name=f"broadcast-album-{user_id}"
+        )
+        if finalizer:
+            album_finalizers[user_id] = finalizer
+        return
+
+    draft.source_message_ids = [message.message_id]
+    _apply_forwarded_text(draft, message)
+    _apply_forwarded_media(draft, message)
+    draft.source_chat_id = message.chat.id
+    await state.clear()
+    await _send_forward_preview(message, draft)
+
+
+async def _finish_forwarded_album(message: Message, state: FSMContext, draft: BroadcastTask):
+    """Сохраняет альбом, если за ALBUM_DEBOUNCE не пришла следующая часть"""
+    await asyncio.sleep(ALBUM_DEBOUNCE)
+    # Дальше не отменяемся: следующая часть запустит новое ожидание
+    album_finalizers.pop(message.from_user.id, None)
+
+    data = await state.get_data()
+    # Ожидание пересылки уже отменили
+    if "forward_album_ids" not in data:
+        return
+    await state.clear()
+
+    draft.source_message_ids = sorted(data["forward_album_ids"])
+    draft.source_chat_id = message.chat.id
+    await _send_forward_preview(message, draft)
+
+
+async def _send_forward_preview(message: Message, draft: BroadcastTask):
+    """Сообщаем об успехе и показываем предпросмотр"""
+    preview_text = await _generate_preview_text(draft)
+    await message.answer(
+        f"✅ Данные из пересланного сообщения сохранены!\n\n{preview_text}",
+        reply_markup=broadcast_constructor_kb(draft)
+    )
+
+
+def _apply_forwarded_text(draft: BroadcastTask, message: Message):
+    """Текст/подпись и entities пересланного сообщения"""
     text = message.text or message.caption
     entities = message.entities or message.caption_entities
 
@@ -147,7 +226,9 @@ async def process_forwarded_message(message: Message, state: FSMContext):
     elif not draft.text:
         draft.text = "📢 Текст отсутствует"
 
-    # Извлекаем медиа
+
+def _apply_forwarded_media(draft: BroadcastTask, message: Message):
+    """Медиа пересланного сообщения (у альбома — первой части)"""
     if message.photo:
         draft.content_type = "photo"
         draft.media = message.photo[-1].file_id
@@ -161,18 +242,7 @@ async def process_forwarded_message(message: Message, state: FSMContext):
     elif message.text:
         draft.content_type = "text"
         draft.media = None
-    # Если ничего не подошло (например, стикер) — сообщим об ошибке
-    else:
-        await message.answer("❌ Неподдерживаемый тип сообщения. Отправьте текст, фото, видео или видео-кружок.")
-        return
-
-    # Сообщаем об успехе и показываем предпросмотр
-    preview_text = await _generate_preview_text(draft)
-    await message.answer(
-        f"✅ Данные из пересланного сообщения сохранены!\n\n{preview_text}",
-        reply_markup=broadcast_constructor_kb(draft)
-    )
-    await state.clear()
+    # Остальное (стикеры, документы, опросы...) рассылается только копией
 
 
 
@@ -240,6 +310,94 @@ async def edit_component(callback: CallbackQuery, state: FSMContext):
 
 
 
+@router.callback_query(F.data == "choose_segment")
+async def choose_segment(callback: CallbackQuery, state: FSMContext):
+    """Выбор аудитории рассылки"""
+    await state.clear()
+    user_id = callback.from_user.id
+    if user_id not in BroadcastService.current_editing:
+        await callback.answer("Черновик не найден!")
+        return
+
+    draft = BroadcastService.current_editing[user_id]
+    await callback.message.edit_text(
+        "🎯 Аудитория рассылки\n\n"
+        f"Сейчас: {SegmentService.describe(draft.segment)}\n\n"
+        "Выберите сегмент:",
+        reply_markup=broadcast_segment_kb()
+    )
+
+
+@router.callback_query(F.data == "segment_promo")
+async def segment_promo_start(callback: CallbackQuery, state: FSMContext):
+    """Сегмент по промо-ссылке — запрашиваем код"""
+    if callback.from_user.id not in BroadcastService.current_editing:
+        await callback.answer("Черновик не найден!")
+        return
+
+    await state.set_state(BroadcastStates.waiting_segment_promo)
+    await callback.message.edit_text(
+        "🏷️ Отправьте код промо-ссылки:",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="❌ Отмена", callback_data="choose_segment")]
+        ])
+    )
+
+
+@router.message(BroadcastStates.waiting_segment_promo)
+async def segment_promo_code(message: Message, state: FSMContext):
+    """Обработка кода промо-ссылки для сегмента"""
+    user_id = message.from_user.id
+    if user_id not in BroadcastService.current_editing:
+        await state.clear()
+        return
+
+    draft = BroadcastService.current_editing[user_id]
+    code = (message.text or "").strip()
+
+    async with SessionLocal() as session:
+        segment = await SegmentService.promo_segment(session, code)
+        if segment is None:
+            await message.answer("❌ Промо-ссылка не найдена. Отправьте другой код:")
+            return
+        count = await SegmentService.count(session, segment)
+
+    draft.segment = segment
+    await state.clear()
+
+    preview_text = await _generate_preview_text(draft)
+    await message.answer(
+        f"✅ Аудитория выбрана: {count} получателей\n\n{preview_text}",
+        reply_markup=broadcast_constructor_kb(draft)
+    )
+
+
+@router.callback_query(F.data.startswith("segment_"))
+async def set_segment(callback: CallbackQuery):
+    """Установка готового сегмента аудитории"""
+    user_id = callback.from_user.id
+    if user_id not in BroadcastService.current_editing:
+        await callback.answer("Черновик не найден!")
+        return
+
+    key = callback.data.replace("segment_", "")
+    if key not in SEGMENT_PRESETS:
+        await callback.answer("Неизвестный сегмент!")
+        return
+
+    draft = BroadcastService.current_editing[user_id]
+    draft.segment = SEGMENT_PRESETS[key][1]
+
+    async with SessionLocal() as session:
+        count = await SegmentService.count(session, draft.segment)
+
+    preview_text = await _generate_preview_text(draft)
+    await callback.message.edit_text(
+        f"✅ Аудитория выбрана: {count} получателей\n\n{preview_text}",
+        reply_markup=broadcast_constructor_kb(draft)
+    )
+
+
 @router.message(BroadcastStates.editing_text)
 async def process_text_edit(message: Message, state: FSMContext):
     """Обработка нового текста"""
@@ -249,6 +407,8 @@ async def process_text_edit(message: Message, state: FSMContext):
 
     draft = BroadcastService.current_editing[user_id]
 
+    # Ручная правка — дальше рассылаем собранный черновик, а не копию поста
+    draft.source_message_ids = None
     draft.text = message.text or ""
 
     if message.entities:
@@ -291,6 +451,9 @@ async def process_media_edit(message: Message, state: FSMContext):
 
     draft = BroadcastService.current_editing[user_id]
 
+    # Ручная правка — дальше рассылаем собранный черновик, а не копию поста
+    draft.source_message_ids = None
+
     # Обрабатываем подпись если есть
     if message.caption:
 
@@ -429,6 +592,24 @@ async def preview_broadcast(callback: CallbackQuery):
             except (json.JSONDecodeError, TypeError, ValueError) as e:
                 print(f"Ошибка парсинга кнопок: {e}")
 
+        # Копия поста — показываем ровно то, что получат пользователи
+        if draft.source_message_ids:
+            if len(draft.source_message_ids) == 1:
+                await callback.bot.copy_message(
+                    callback.from_user.id,
+                    draft.source_chat_id,
+                    draft.source_message_ids[0],
+                    reply_markup=kb
+                )
+            else:
+                await callback.bot.copy_messages(
+                    callback.from_user.id,
+                    draft.source_chat_id,
+                    draft.source_message_ids
+                )
+            await callback.answer("✅ Предпросмотр отправлен!")
+            return
+
         # Получаем значения
         content_type = draft.content_type or "text"
         text = draft.text or ""
@@ -522,6 +703,11 @@ async def _generate_preview_text(draft) -> str:
     if draft.media:
         preview_parts.append("🖼️ Медиа: ✅")
 
+    if draft.source_message_ids:
+        preview_parts.append(f"📋 Копия поста: ✅ ({len(draft.source_message_ids)} сообщ.)")
+
+    preview_parts.append(f"🎯 Аудитория: {SegmentService.describe(draft.segment)}")
+
 
     return "\n".join(preview_parts)
 #
@@ -1071,14 +1257,15 @@ async def start_broadcast(callback: CallbackQuery):
 
     draft = BroadcastService.current_editing[user_id]
 
-    # Валидация
-    if not draft.text and draft.content_type != "video_note":
-        await callback.answer("Текст рассылки не может быть пустым!")
-        return
+    # Валидация (копия поста самодостаточна)
+    if not draft.source_message_ids:
+        if not draft.text and draft.content_type != "video_note":
+            await callback.answer("Текст рассылки не может быть пустым!")
+            return
 
-    if draft.content_type in ["photo", "video"] and not draft.media:
-        await callback.answer("Необходимо добавить медиа!")
-        return
+        if draft.content_type in ["photo", "video"] and not draft.media:
+            await callback.answer("Необходимо добавить медиа!")
+            return
 
     # Запрашиваем подтверждение
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
@@ -1167,14 +1354,17 @@ async def confirm_broadcast(callback: CallbackQuery, bot: Bot):
     draft = BroadcastService.current_editing[user_id]
 
     draft.status = "pending"
+    draft.created_by = user_id
 
     async with SessionLocal() as session:
         session.add(draft)
         await session.commit()
         await session.refresh(draft)
 
-    asyncio.create_task(
-        BroadcastService.send_task(bot, draft)
+    # Под супервизором: при остановке процесса рассылка сохранит курсор;
+    # во время остановки не стартует, а останется pending до рестарта
+    supervisor.spawn(
+        BroadcastService.send_task(bot, draft), name=f"broadcast-{draft.id}"
     )
 
     BroadcastService.current_editing.pop(user_id, None)
@@ -1343,7 +1533,7 @@ async def broadcast_info(callback: CallbackQuery):
 
     await callback.message.edit_text(
         info_text,
-        reply_markup=broadcast_control_kb(task.id),
+        reply_markup=broadcast_control_kb(task.id, can_resume=task.status == "stopped"),
         parse_mode="HTML"
     )
 
@@ -1370,6 +1560,19 @@ async def stop_broadcast(callback: CallbackQuery):
     await broadcast_info(callback)  # Обновляем информацию
 
 
+@router.callback_query(F.data.startswith("resume_broadcast_"))
+async def resume_broadcast(callback: CallbackQuery, bot: Bot):
+    """Продолжение остановленной рассылки с места остановки"""
+    task_id = int(callback.data.replace("resume_broadcast_", ""))
+
+    if not await BroadcastService.resume_task(bot, task_id):
+        await callback.answer("Рассылку нельзя продолжить!")
+        return
+
+    await callback.answer("▶️ Рассылка продолжена!")
+    await broadcast_info(callback)
+
+
 @router.callback_query(F.data == "broadcast_history")
 async def broadcast_history(callback: CallbackQuery):
     """История рассылок"""
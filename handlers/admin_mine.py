@@ -1,22 +1,26 @@
 # handlers/admin_mines.py (или в любом вашем роутере)
 import json
 import re
+from functools import lru_cache
 from typing import Optional
 
 from aiogram import Router, F
 from aiogram.types import Message
-from redis.asyncio import Redis
 from aiogram.filters import Command
 
 from config import settings  # ваши настройки
 
 router = Router()
 
-# Подключаем Redis (настройки возьмите из переменных окружения / settings)
-redis_client = Redis.from_url(
-    "redis://127.0.0.1:6379",
-    decode_responses=True,
-)
+@lru_cache(maxsize=1)
+def get_redis_client():
+    """Клиент Redis создаётся при первой команде — импорт redis небыстрый"""
+    from redis.asyncio import Redis
+
+    return Redis.from_url(
+        settings.redis_url,
+        decode_responses=True,
+    )
 
 
 def format_mines_grid(grid_size: int, mines: list[int], opened: Optional[list[int]] = None) -> str:
@@ -67,14 +71,14 @@ async def cmd_mine(message: Message):
 
     # 1. Ищем активную сессию пользователя
     game_key = f"mines:user:{user_id}"
-    session_id = await redis_client.get(game_key)
+    session_id = await get_redis_client().get(game_key)
 
     if not session_id:
         await message.answer(f"ℹ️ У пользователя <code>{user_id}</code> нет активной игры Mines.", parse_mode="HTML")
         return
 
     # 2. Получаем данные сессии
-    raw_session = await redis_client.get(f"mines:{session_id}")
+    raw_session = await get_redis_client().get(f"mines:{session_id}")
     if not raw_session:
         await message.answer("❌ Данные сессии устарели (ключ не найден).")
         return
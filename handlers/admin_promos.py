@@ -2,7 +2,7 @@ from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from config import settings
-from db import SessionLocal
+from db import ReadSessionLocal
 from middlewares.database import DataBaseSessionMiddleware
 from models.bets import Bet
 from models.gift_withdrawals import GiftWithdrawal
@@ -308,11 +308,12 @@ def format_promo_basic_info(promo: PromoLink, referrals_count: int, total_deposi
 # Команда /promos с пагинацией (по одной ссылке на страницу)
 # ==================================================
 @router.message(Command("promos"))
-async def cmd_promos(message: Message, session: AsyncSession):
+async def cmd_promos(message: Message):
     if message.from_user.id not in settings.admins:
         return
 
-    await show_promos_list(message, session, 1)
+    async with ReadSessionLocal() as session:
+        await show_promos_list(message, session, 1)
 
 
 async def show_promos_list(target, session: AsyncSession, page: int):
@@ -396,7 +397,7 @@ async def show_promos_list(target, session: AsyncSession, page: int):
 async def cb_promo_info(cb: CallbackQuery):
     promo_id = int(cb.data.split(":")[1])
 
-    async with SessionLocal() as session:
+    async with ReadSessionLocal() as session:
         stats = await get_promo_stats(session, promo_id)
 
     if not stats:
@@ -420,7 +421,7 @@ async def cb_promo_info(cb: CallbackQuery):
 async def cb_promos_list(cb: CallbackQuery):
     page = int(cb.data.split(":")[1])
 
-    async with SessionLocal() as session:
+    async with ReadSessionLocal() as session:
         await show_promos_list(cb, session, page)
 
     await cb.answer()
@@ -450,7 +451,7 @@ async def cb_promo_users(cb: CallbackQuery):
 
     offset = (page - 1) * ITEMS_PER_PAGE
 
-    async with SessionLocal() as session:
+    async with ReadSessionLocal() as session:
         # Получаем пользователей с пагинацией через связь PromoReferral
         users_stmt = (
             select(User)
@@ -576,7 +577,7 @@ async def cb_promo_referral_earnings(cb: CallbackQuery):
 
     offset = (page - 1) * ITEMS_PER_PAGE
 
-    async with SessionLocal() as session:
+    async with ReadSessionLocal() as session:
         # Получаем информацию о промо-ссылке
         promo_stmt = select(PromoLink).where(PromoLink.id == promo_id)
         promo_result = await session.execute(promo_stmt)
@@ -750,7 +751,7 @@ async def delete_promo(message: Message, session: AsyncSession):
 # Команда /promo_stats - быстрая статистика по промо-ссылке
 # ==================================================
 @router.message(Command("ref"))
-async def cmd_promo_stats(message: Message, session: AsyncSession):
+async def cmd_promo_stats(message: Message):
     """
     Команда для админов: /ref <промо_ссылка>
     Показывает детальную статистику по промо-ссылке сразу
@@ -788,21 +789,22 @@ async def cmd_promo_stats(message: Message, session: AsyncSession):
         )
         return
 
-    # Ищем промо по коду в базе данных
-    promo_stmt = (
-        select(PromoLink)
-        .where(PromoLink.code == promo_code)
-        .options(selectinload(PromoLink.referrals))
-    )
-    promo_result = await session.execute(promo_stmt)
-    promo = promo_result.scalar_one_or_none()
+    async with ReadSessionLocal() as session:
+        # Ищем промо по коду в базе данных
+        promo_stmt = (
+            select(PromoLink)
+            .where(PromoLink.code == promo_code)
+            .options(selectinload(PromoLink.referrals))
+        )
+        promo_result = await session.execute(promo_stmt)
+        promo = promo_result.scalar_one_or_none()
 
-    if not promo:
-        await message.answer(f"❌ Промо-ссылка с кодом <code>{promo_code}</code> не найдена.", parse_mode="HTML")
-        return
+        if not promo:
+            await message.answer(f"❌ Промо-ссылка с кодом <code>{promo_code}</code> не найдена.", parse_mode="HTML")
+            return
 
-    # Получаем полную статистику по промо-ссылке
-    stats = await get_promo_stats(session, promo.id)
+        # Получаем полную статистику по промо-ссылке
+        stats = await get_promo_stats(session, promo.id)
 
     if not stats:
         await message.answer("❌ Не удалось получить статистику по промо-ссылке.")
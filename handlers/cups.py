@@ -9,7 +9,7 @@ from aiogram.filters import Command
 from aiogram import Bot
 
 from config import settings
-from db import SessionLocal
+from db import ReadSessionLocal
 from services.cups import CupsAnalyticsService
 
 router = Router()
@@ -109,7 +109,7 @@ async def cmd_cups(message: Message, bot: Bot):
 
     health, latency = await get_health()
 
-    async with SessionLocal() as session:
+    async with ReadSessionLocal() as session:
         service = CupsAnalyticsService(session)
         all_time = await service.global_stats()
 
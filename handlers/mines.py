@@ -9,7 +9,7 @@ from aiogram.filters import Command
 from aiogram import Bot
 
 from config import settings
-from db import SessionLocal
+from db import ReadSessionLocal
 from services.mines import MinesAnalyticsService
 
 router = Router()
@@ -112,7 +112,7 @@ async def cmd_mines(message: Message, bot: Bot):
 
     health, latency = await get_health()
 
-    async with SessionLocal() as session:
+    async with ReadSessionLocal() as session:
         service = MinesAnalyticsService(session)
         all_time = await service.global_stats()
 
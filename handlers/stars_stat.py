@@ -1,15 +1,13 @@
 import io
 from datetime import datetime
 
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from aiogram import F, Router
 from aiogram.types import Message, BufferedInputFile
 from sqlalchemy import select, func, and_, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
-from db import SessionLocal
+from db import ReadSessionLocal
 from models.star_invoice import StarsInvoice
 from models.users import User
 
@@ -109,6 +107,10 @@ def generate_monthly_chart(monthly_data: dict) -> io.BytesIO:
     if not monthly_data:
         return None
 
+    # matplotlib грузится несколько секунд — только когда график действительно нужен
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
     # Сортируем месяцы хронологически
     sorted_months = sorted(monthly_data.items(), key=lambda x: x[0])
 
@@ -189,7 +191,7 @@ async def stars_statistics(message: Message):
     if message.from_user.id not in settings.admins:
         return
 
-    async with SessionLocal() as session:
+    async with ReadSessionLocal() as session:
         stats = await get_stars_statistics(session)
 
     total_sum = stats["total_sum"]
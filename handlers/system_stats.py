@@ -5,6 +5,9 @@ import aiohttp
 import json
 
 from config import settings
+from db import engine, replica_engine
+from utils.pool_metrics import pool_stats_text
+from utils.sql_metrics import sql_stats_text
 
 router = Router()
 
@@ -18,6 +21,33 @@ async def cmd_system_stats(message: Message, bot: Bot):
     await send_system_stats(message, bot)
 
 
+@router.message(Command("db_pool"))
+async def cmd_db_pool(message: Message):
+    """Состояние пула соединений БД и время ожидания соединения"""
+    if message.from_user.id not in settings.admins:
+        return
+
+    # Аналитика через ReadSessionLocal ходит в реплику со своим пулом
+    if replica_engine is engine:
+        text = pool_stats_text(engine.pool)
+    else:
+        text = (
+            pool_stats_text(engine.pool, "Пул соединений БД (primary)")
+            + "\n\n"
+            + pool_stats_text(replica_engine.pool, "Пул соединений реплики")
+        )
+    await message.answer(text, parse_mode="HTML")
+
+
+@router.message(Command("sql_stats"))
+async def cmd_sql_stats(message: Message):
+    """Запросы к БД по обработчикам: количество, время, подозрения на N+1"""
+    if message.from_user.id not in settings.admins:
+        return
+
+    await message.answer(sql_stats_text(), parse_mode="HTML")
+
+
 async def get_system_stats():
     """Получение статистики системы с game сервера"""
     try:
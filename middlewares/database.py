@@ -1,17 +1,83 @@
+import logging
+from contextvars import ContextVar
 from typing import Callable, Awaitable, Dict, Any
 from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram.types import TelegramObject, Update
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from db import SessionLocal
 
+logger = logging.getLogger(__name__)
+
+# Сессии, взявшие соединение за время обработки текущего апдейта
+update_sessions: ContextVar[set[int] | None] = ContextVar("update_sessions", default=None)
+
+
+@event.listens_for(Session, "after_begin")
+def _track_session(session, transaction, connection):
+    # Хук синхронный, но greenlet SQLAlchemy несёт контекст вызывающей корутины
+    sessions = update_sessions.get()
+    if sessions is not None:
+        sessions.add(id(session))
+
+
+class LazySession:
+    """
+    Прокси AsyncSession для обработчиков: сама сессия создаётся
+    при первом обращении, соединение из пула — при первом запросе.
+    Апдейты, которым БД не нужна, сессию не создают вовсе.
+    """
+
+    __slots__ = ("_session",)
+
+    def __init__(self):
+        self._session: AsyncSession | None = None
+
+    def __getattr__(self, name: str):
+        if self._session is None:
+            self._session = SessionLocal()
+        return getattr(self._session, name)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
 
 class DataBaseSessionMiddleware(BaseMiddleware):
+    """
+    Кладёт в data["session"] ленивую сессию и следит, сколько сессий
+    взяли соединение за один апдейт: обработчики со своим SessionLocal()
+    держат второе соединение из пула, такие апдейты пишутся в лог.
+    """
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with SessionLocal() as session:
-            data["session"] = session
+        session = LazySession()
+        sessions: set[int] = set()
+        token = update_sessions.set(sessions)
+        data["session"] = session
+        try:
             return await handler(event, data)
+        finally:
+            update_sessions.reset(token)
+            await session.close()
+            if len(sessions) > 1:
+                logger.warning(
+                    "Апдейт %s: сессий БД за обработку — %s", self._describe(event), len(sessions)
+                )
+
+    @staticmethod
+    def _describe(event: TelegramObject) -> str:
+        if not isinstance(event, Update):
+            return type(event).__name__
+        if event.callback_query:
+            return f"callback_query {event.callback_query.data!r}"
+        if event.message and event.message.text:
+            return f"message {event.message.text[:32]!r}"
+        return event.event_type
@@ -0,0 +1,92 @@
+import time
+from typing import Callable, Awaitable, Dict, Any
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject
+
+from utils.metrics import ApiMetrics, HandlerCall, HandlerMetrics, api_metrics, current_call, handler_metrics
+from utils.sql_metrics import current_sql
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Время, ошибки, время в БД и в Bot API по обработчикам (utils.metrics).
+
+    Внутренний middleware на события: вызывается только для сработавшего
+    обработчика, после фильтров. Время в БД — прирост счётчика SQL апдейта
+    (SqlStatsMiddleware должен стоять снаружи), время в Bot API —
+    от ApiMetricsMiddleware через current_call.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object = data.get("handler")
+        if handler_object is None:
+            return await handler(event, data)
+
+        callback = handler_object.callback
+        key = (callback.__module__, callback.__qualname__)
+        metrics = handler_metrics.get(key)
+        if metrics is None:
+            metrics = handler_metrics[key] = HandlerMetrics()
+
+        sql = current_sql.get()
+        db_ms, db_queries = (sql.time_ms, sql.queries) if sql else (0.0, 0)
+        call = HandlerCall()
+        token = current_call.set(call)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            metrics.latency.observe(time.perf_counter() - started)
+            current_call.reset(token)
+            metrics.api_seconds += call.api_seconds
+            metrics.api_requests += call.api_requests
+            if sql:
+                metrics.db_seconds += (sql.time_ms - db_ms) / 1000
+                metrics.db_queries += sql.queries - db_queries
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Время запросов к Bot API по методам. Регистрируется после
+    SessionRateLimiter — меряет сам запрос, без ожидания лимитов.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType,
+            bot: Bot,
+            method: TelegramMethod,
+    ):
+        api_method = method.__api_method__
+        # Long polling висит до timeout — его время ни о чём не говорит
+        if api_method == "getUpdates":
+            return await make_request(bot, method)
+
+        metrics = api_metrics.get(api_method)
+        if metrics is None:
+            metrics = api_metrics[api_method] = ApiMetrics()
+
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.latency.observe(elapsed)
+            call = current_call.get()
+            if call is not None:
+                call.api_seconds += elapsed
+                call.api_requests += 1
@@ -1,87 +1,118 @@
 from aiolimiter import AsyncLimiter
-from aiogram import BaseMiddleware
-from aiogram.types import TelegramObject
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject, Update
 from typing import Callable, Dict, Any
-import functools
-from collections import defaultdict
+
+from config import settings
+from utils.priority_limiter import Lane, outgoing_limiter, send_lane
+from utils.redis_limiter import DistributedLimiter
+from utils.ttl_cache import TTLCache
+
+# Служебные запросы, которые не должны ждать в общей очереди (long polling и т.п.)
+UNLIMITED_METHODS = frozenset({
+    "getUpdates", "getMe", "setWebhook", "deleteWebhook", "getWebhookInfo", "logOut", "close",
+})
+
+# Запросы, которые Telegram считает сообщениями в чат — на них действует лимит чата
+CHAT_METHOD_PREFIXES = ("send", "copy", "forward", "edit")
 
 
 class RateLimiterMiddleware(BaseMiddleware):
     """
-    Middleware для ограничения скорости отправки сообщений.
-    Учитывает:
-    1. Глобальный лимит бота (25/сек)
-    2. Лимит на пользователя (1/3 сек)
+    Выбирает полосу приоритета (utils.priority_limiter) для всех запросов,
+    сделанных при обработке апдейта: ответы пользователям, затем админам,
+    затем уведомления об оплатах. Сами лимиты — в SessionRateLimiter.
     """
 
-    def __init__(self, rate: int = 25, time_period: int = 1):
-        super().__init__()
-        # Глобальный лимитер на все отправки бота
-        self.global_limiter = AsyncLimiter(rate, time_period)
-        # Лимитеры для отдельных чатов (user_id → AsyncLimiter)
-        self.user_limiters: Dict[int, AsyncLimiter] = defaultdict(
-            lambda: AsyncLimiter(1, 1)  # 1 сообщение в 1 секунду
-        )
-        self._wrapped_bots: Dict[int, bool] = {}
-
     async def __call__(
             self,
             handler: Callable,
             event: TelegramObject,
             data: Dict[str, Any]
     ) -> Any:
-        bot = data.get("bot")
-        if bot and id(bot) not in self._wrapped_bots:
-            await self._wrap_bot_methods(bot)
-            self._wrapped_bots[id(bot)] = True
-
-        return await handler(event, data)
-
-
-    async def _wrap_bot_methods(self, bot):
-        """Оборачиваем методы отправки бота в двойной лимитер"""
-
-        methods_to_wrap = [
-            'send_message', 'send_photo', 'send_video',
-            'send_document', 'send_audio', 'send_video_note',
-            'send_media_group', 'copy_message', 'forward_message',
-        ]
-
-        for method_name in methods_to_wrap:
-            if hasattr(bot, method_name):
-                original_method = getattr(bot, method_name)
-
-                @functools.wraps(original_method)
-                async def wrapped_method(*args, __original=original_method, **kwargs):
-                    # Извлекаем user_id из аргументов
-                    user_id = self._extract_user_id(args, kwargs)
-
-                    # 1. Глобальный лимит бота
-                    async with self.global_limiter:
-                        # 2. Лимит для конкретного пользователя
-                        if user_id:
-                            user_limiter = self.user_limiters[user_id]
-                            async with user_limiter:
-                                return await __original(*args, **kwargs)
-                        else:
-                            return await __original(*args, **kwargs)
-
-                setattr(bot, method_name, wrapped_method)
-
-
-    def _extract_user_id(self, args, kwargs):
-        """Извлекает user_id из аргументов метода отправки"""
-        # Позиционные аргументы: send_message(chat_id, text, ...)
-        if args and len(args) > 0:
-            # Первый аргумент обычно chat_id
-            chat_id = args[0]
-            if isinstance(chat_id, int):
-                return chat_id
-
-        # Именованные аргументы
-        if 'chat_id' in kwargs:
-            chat_id = kwargs['chat_id']
-            if isinstance(chat_id, int):
-                return chat_id
-
-        return None
\ No newline at end of file
+        token = send_lane.set(self._lane(event, data))
+        try:
+            return await handler(event, data)
+        finally:
+            send_lane.reset(token)
+
+    @staticmethod
+    def _lane(event: TelegramObject, data: Dict[str, Any]) -> Lane:
+        """Полоса для всех отправок, сделанных при обработке апдейта"""
+        if isinstance(event, Update) and (
+            event.pre_checkout_query
+            or (event.message and event.message.successful_payment)
+        ):
+            return Lane.PAYMENT
+        user = data.get("event_from_user")
+        if user and user.id in settings.admins:
+            return Lane.ADMIN
+        return Lane.INTERACTIVE
+
+
+class SessionRateLimiter(BaseRequestMiddleware):
+    """
+    Лимиты на уровне сессии бота — на каждый запрос к Bot API,
+    а не на отдельные send_*.
+    Учитывает:
+    1. Глобальный лимит бота (settings.bot_global_rate/сек) с приоритетом полос
+    2. Лимит на чат для сообщений: личка — 1/сек, группы и каналы — 20/мин
+    Оба лимита держатся в Redis и общие для всех процессов бота,
+    локальные AsyncLimiter — запасной вариант, пока Redis недоступен.
+    В полосе рассылок лимит чата не применяется: каждому получателю
+    уходит одно сообщение, а темп держит сама рассылка.
+
+    Цена на запрос: очередь приоритетов плюс EVALSHA глобального лимита;
+    у send*/copy*/forward*/edit* вне рассылки — второй EVALSHA на лимит чата.
+    Один общий скрипт на оба лимита не делаем: ожидание лимита чата
+    держало бы очередь приоритетов и тормозило ответы другим чатам.
+    """
+
+    def __init__(self):
+        # Локальные лимитеры чатов на случай недоступности Redis (chat_id → AsyncLimiter).
+        # Ограничены по размеру и времени простоя: после рассылки на весь
+        # бот не остаётся по объекту на каждого получателя
+        self.private_limiters: TTLCache[AsyncLimiter] = TTLCache(
+            lambda: AsyncLimiter(1, 1),  # 1 сообщение в 1 секунду
+            maxsize=settings.chat_limiter_maxsize,
+            ttl=settings.chat_limiter_ttl,
+        )
+        self.group_limiters: TTLCache[AsyncLimiter] = TTLCache(
+            lambda: AsyncLimiter(20, 60),  # 20 сообщений в минуту
+            maxsize=settings.chat_limiter_maxsize,
+            ttl=settings.chat_limiter_ttl,
+        )
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType,
+            bot: Bot,
+            method: TelegramMethod,
+    ):
+        api_method = method.__api_method__
+        if api_method in UNLIMITED_METHODS:
+            return await make_request(bot, method)
+
+        await outgoing_limiter.acquire()
+
+        chat_id = getattr(method, "chat_id", None)
+        if (
+            chat_id is not None
+            and api_method.startswith(CHAT_METHOD_PREFIXES)
+            and send_lane.get() != Lane.BULK
+        ):
+            await self._chat_limiter(chat_id).acquire()
+
+        return await make_request(bot, method)
+
+    def _chat_limiter(self, chat_id: int | str) -> DistributedLimiter:
+        # Группы и каналы — отрицательные id или @username
+        if isinstance(chat_id, int) and chat_id > 0:
+            return DistributedLimiter(
+                f"chat:{chat_id}", 1, 1, fallback=self.private_limiters[chat_id]
+            )
+        return DistributedLimiter(
+            f"chat:{chat_id}", 20, 60, fallback=self.group_limiters[chat_id]
+        )
@@ -0,0 +1,39 @@
+from typing import Callable, Awaitable, Dict, Any
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.sql_metrics import UpdateSql, current_sql, record_update
+
+
+class SqlStatsMiddleware(BaseMiddleware):
+    """
+    Считает SQL каждого апдейта (utils.sql_metrics).
+
+    Регистрируется дважды: внешним на update — заводит счётчик на апдейт
+    и по окончании складывает его в статистику обработчика; внутренним
+    на события — подписывает счётчик именем сработавшего обработчика.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if not isinstance(event, Update):
+            sql = current_sql.get()
+            handler_object = data.get("handler")
+            if sql is not None and handler_object is not None:
+                callback = handler_object.callback
+                sql.handler = f"{callback.__module__}.{callback.__qualname__}"
+            return await handler(event, data)
+
+        sql = UpdateSql()
+        token = current_sql.set(sql)
+        try:
+            return await handler(event, data)
+        finally:
+            current_sql.reset(token)
+            if sql.queries:
+                sql.handler = sql.handler or event.event_type
+                record_update(sql)
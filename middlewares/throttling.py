@@ -0,0 +1,88 @@
+import logging
+import time
+from collections import deque
+from typing import Callable, Awaitable, Dict, Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from config import settings
+from utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+THROTTLED_TEXT = "⏳ Слишком часто, подождите немного"
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Антифлуд входящих апдейтов по from_user.id.
+
+    Скользящее окно: в группе обработчиков не больше limit апдейтов
+    за window секунд (settings.throttle_windows). Лишние апдейты
+    отбрасываются до DataBaseSessionMiddleware — спамер не занимает
+    соединения из пула и не гоняет get_chat_member.
+    На первый отброшенный callback в серии отвечаем подсказкой, остальные
+    схлопываются молча. Оплаты и админы не ограничиваются.
+    """
+
+    def __init__(self):
+        # (user_id, группа) → времена последних апдейтов, не больше limit штук
+        self.windows: TTLCache[deque] = TTLCache(
+            deque,
+            maxsize=settings.chat_limiter_maxsize,
+            ttl=max(window for _, window in settings.throttle_windows.values()),
+        )
+        # Кому уже ответили на отброшенный callback в текущей серии
+        self.notified: set[tuple[int, str]] = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        group = self._group(event)
+        if user is None or group is None or user.id in settings.admins:
+            return await handler(event, data)
+
+        limit, window = settings.throttle_windows[group]
+        key = (user.id, group)
+        timestamps = self.windows[key]
+        now = time.monotonic()
+
+        if len(timestamps) >= limit and now - timestamps[0] < window:
+            await self._on_throttled(event, key)
+            return None
+
+        if len(timestamps) >= limit:
+            timestamps.popleft()
+        timestamps.append(now)
+        self.notified.discard(key)
+        return await handler(event, data)
+
+    @staticmethod
+    def _group(event: TelegramObject) -> str | None:
+        """Группа обработчиков апдейта; None — не ограничиваем"""
+        if not isinstance(event, Update):
+            return None
+        if event.callback_query:
+            return "callback"
+        message = event.message
+        if message is None or message.successful_payment:
+            return None
+        if message.text and message.text.startswith("/"):
+            return "command"
+        return "message"
+
+    async def _on_throttled(self, event: Update, key: tuple[int, str]):
+        logger.info("Антифлуд: апдейт %s от %s отброшен", key[1], key[0])
+        if event.callback_query and key not in self.notified:
+            if len(self.notified) >= settings.chat_limiter_maxsize:
+                self.notified.clear()
+            self.notified.add(key)
+            try:
+                await event.callback_query.answer(THROTTLED_TEXT)
+            except Exception:
+                pass
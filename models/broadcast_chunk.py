@@ -0,0 +1,22 @@
+# bot/models/broadcast_chunk.py
+from sqlalchemy import Column, Integer, BigInteger, Text, TIMESTAMP, ForeignKey, func
+
+from db import Base
+
+
+class BroadcastChunk(Base):
+    """Диапазон получателей рассылки, который процесс берёт в аренду"""
+    __tablename__ = "broadcast_chunks"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey("broadcast_tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    start_id = Column(BigInteger, nullable=False)  # первый telegram_id диапазона
+    end_id = Column(BigInteger, nullable=True)  # последний telegram_id (NULL — до конца)
+    status = Column(Text, nullable=False, default="pending")  # pending, leased, done
+    lease_owner = Column(Text, nullable=True)
+    lease_until = Column(TIMESTAMP(timezone=True), nullable=True)
+    last_user_id = Column(BigInteger, nullable=True)  # курсор внутри диапазона
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -0,0 +1,12 @@
+# bot/models/broadcast_recipient.py
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+
+from db import Base
+
+
+class BroadcastRecipient(Base):
+    """Снимок аудитории рассылки: фиксируется один раз при запуске"""
+    __tablename__ = "broadcast_recipients"
+
+    task_id = Column(Integer, ForeignKey("broadcast_tasks.id", ondelete="CASCADE"), primary_key=True)
+    telegram_id = Column(BigInteger, primary_key=True)
@@ -1,5 +1,5 @@
 # bot/models/broadcast_task.py
-from sqlalchemy import Column, Integer, Text, Boolean, TIMESTAMP, JSON, func
+from sqlalchemy import Column, Integer, BigInteger, Text, Boolean, TIMESTAMP, JSON, func
 from sqlalchemy.dialects.postgresql import JSONB
 
 from db import Base
@@ -12,12 +12,22 @@ class BroadcastTask(Base):
     content_type = Column(Text, nullable=False)  # text, photo, video, video_note
     text = Column(Text, nullable=True)
     media = Column(Text, nullable=True)  # URL или file_id
+    media_file_id = Column(Text, nullable=True)  # file_id после однократной загрузки media
     buttons = Column(JSON, default=[])  # список dict {text, url|web_app}
     total = Column(Integer, default=0)
     sent = Column(Integer, default=0)
     failed = Column(Integer, default=0)
     status = Column(Text, default="pending")  # pending, sending, stopped, done
     entities = Column(JSONB, nullable=True)
+    last_user_id = Column(BigInteger, nullable=True)  # курсор: все telegram_id <= обработаны
+    created_by = Column(BigInteger, nullable=True)  # telegram_id админа, запустившего рассылку
+    # Режим копирования: пост рассылается через copy_message(s) из чата админа
+    source_chat_id = Column(BigInteger, nullable=True)
+    source_message_ids = Column(JSON, nullable=True)  # несколько id — альбом
+    segment = Column(JSONB, nullable=True)  # определение сегмента аудитории, NULL — все (см. services/segments.py)
+    # Аренда: рассылку без чанков шлёт ровно один процесс (см. BroadcastService.claim_task)
+    lease_owner = Column(Text, nullable=True)  # "hostname:pid"
+    lease_until = Column(TIMESTAMP(timezone=True), nullable=True)
 
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
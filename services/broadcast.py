@@ -3,18 +3,46 @@
 # bot/services/broadcast.py
 import asyncio
 import json
+import logging
+import os
+import socket
+from collections import deque
+from datetime import timedelta
+from typing import Callable, Awaitable
 from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, MessageEntity
 from models.broadcast_task import BroadcastTask
+from models.broadcast_recipient import BroadcastRecipient
+from config import settings
 from db import SessionLocal
 from models.users import User
-from sqlalchemy import select, update, func
-from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from services.segments import SegmentService
+from sqlalchemy import select, update, delete, insert, literal, exists, func, or_
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
+from utils.adaptive_limiter import AdaptiveRateLimiter
+from utils.priority_limiter import Lane, send_lane
+from services.broadcast_progress import BroadcastProgressReporter
+from services.broadcast_payload import Delivery, PreparedBroadcast, broadcast_methods
+from utils.task_supervisor import detached_task, supervisor
+
+logger = logging.getLogger(__name__)
+
+
+# Сколько получателей читаем из снимка за одну короткую транзакцию
+RECIPIENTS_BATCH_SIZE = 1000
+
+# Сколько раз пробуем отправить одному пользователю после флуд-лимита
+MAX_RETRY_AFTER_ATTEMPTS = 5
 
 
 class BroadcastService:
     stop_flags: dict[int, asyncio.Event] = {}
+    # Процесс останавливается: рассылки сохраняют курсор и остаются sending,
+    # чтобы resume_unfinished подхватил их после рестарта
+    shutting_down = False
     current_editing: dict[int, BroadcastTask] = {}  # Храним редактируемые задачи по user_id
+    # Владелец аренды рассылок и чанков в БД
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
 
     @staticmethod
     async def create_draft(user_id: int) -> BroadcastTask:
@@ -64,121 +92,602 @@ class BroadcastService:
             await session.commit()
 
     @staticmethod
-    async def save_progress(task: BroadcastTask):
+    async def materialize_recipients(task: BroadcastTask) -> int:
+        """
+        Фиксирует аудиторию рассылки (сегмент task.segment) в broadcast_recipients
+        одним INSERT ... SELECT.
+        Возвращает точное количество получателей.
+        """
         async with SessionLocal() as session:
             await session.execute(
-                update(BroadcastTask)
-                .where(BroadcastTask.id == task.id)
-                .values(
-                    sent=task.sent,
-                    failed=task.failed,
-                    status=task.status
+                delete(BroadcastRecipient).where(BroadcastRecipient.task_id == task.id)
+            )
+            audience = SegmentService.recipients_query(task.segment).subquery()
+            result = await session.execute(
+                insert(BroadcastRecipient).from_select(
+                    ["task_id", "telegram_id"],
+                    select(literal(task.id), audience.c.telegram_id)
                 )
             )
             await session.commit()
+            return result.rowcount or 0
 
-    # ------------------------- основной метод -------------------------
     @staticmethod
-    async def send_task(bot: Bot, task: BroadcastTask):
+    async def has_recipients(task_id: int) -> bool:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(exists().where(BroadcastRecipient.task_id == task_id))
+            )
+            return bool(result.scalar())
 
-        stop_event = asyncio.Event()
-        BroadcastService.stop_flags[task.id] = stop_event
+    @staticmethod
+    async def fetch_recipients(
+        task_id: int,
+        after_id: int | None,
+        limit: int,
+        upper_id: int | None = None,
+    ) -> list[int]:
+        """Следующая пачка получателей из снимка по keyset-курсору"""
+        query = (
+            select(BroadcastRecipient.telegram_id)
+            .where(BroadcastRecipient.task_id == task_id)
+            .order_by(BroadcastRecipient.telegram_id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            query = query.where(BroadcastRecipient.telegram_id > after_id)
+        if upper_id is not None:
+            query = query.where(BroadcastRecipient.telegram_id <= upper_id)
 
-        task.status = "sending"
-        task.sent = 0
-        task.failed = 0
-        blocked_buffer = []
+        async with SessionLocal() as session:
+            result = await session.execute(query)
+            return list(result.scalars().all())
 
+    @staticmethod
+    async def drop_recipients(task_id: int):
         async with SessionLocal() as session:
-            # Считаем total и сохраняем
-            count_result = await session.execute(
-                select(func.count())
-                .select_from(User)
-                .where(User.is_blocked.is_(False))
+            await session.execute(
+                delete(BroadcastRecipient).where(BroadcastRecipient.task_id == task_id)
             )
-            task.total = count_result.scalar() or 0
-            session.add(task)
             await session.commit()
 
-            # Подготавливаем keyboard и entities один раз
-            kb, entities = BroadcastService.build_keyboard_and_entities(task)
+    @staticmethod
+    async def save_progress(task: BroadcastTask, release: bool = False) -> bool:
+        """
+        Сохраняет счётчики и курсор, пока рассылка в нашей аренде.
+        release=True — заодно отпускает аренду.
+        False — рассылку перехватил другой процесс, писать нельзя.
+        """
+        values = dict(
+            sent=task.sent,
+            failed=task.failed,
+            status=task.status,
+            last_user_id=task.last_user_id
+        )
+        if release:
+            values.update(lease_owner=None, lease_until=None)
+        async with SessionLocal() as session:
+            result = await session.execute(
+                update(BroadcastTask)
+                .where(
+                    BroadcastTask.id == task.id,
+                    BroadcastTask.lease_owner == BroadcastService.worker_id,
+                )
+                .values(**values)
+            )
+            await session.commit()
+        return result.rowcount == 1
 
-            # Стримим пользователей
-            result = await session.stream(
-                select(User.telegram_id)
-                .where(User.is_blocked.is_(False))
+    # ------------------------- аренда -------------------------
+    @staticmethod
+    def lease_duration() -> timedelta:
+        return timedelta(seconds=settings.broadcast_lease_seconds)
+
+    @staticmethod
+    async def claim_task(task_id: int) -> bool:
+        """
+        Берёт рассылку в аренду (или продлевает свою) одним UPDATE.
+        False — аренда у другого живого процесса: два процесса с одного
+        курсора слали бы одним и тем же получателям.
+        """
+        async with SessionLocal() as session:
+            result = await session.execute(
+                update(BroadcastTask)
+                .where(
+                    BroadcastTask.id == task_id,
+                    BroadcastTask.status != "done",
+                    or_(
+                        BroadcastTask.lease_owner.is_(None),
+                        BroadcastTask.lease_owner == BroadcastService.worker_id,
+                        BroadcastTask.lease_until < func.now(),
+                    ),
+                )
+                .values(
+                    lease_owner=BroadcastService.worker_id,
+                    lease_until=func.now() + BroadcastService.lease_duration(),
+                )
             )
+            await session.commit()
+        return result.rowcount == 1
 
-            async for row in result:
-                if stop_event.is_set():
-                    task.status = "stopped"
-                    break
+    @staticmethod
+    async def release_task(task_id: int):
+        async with SessionLocal() as session:
+            await session.execute(
+                update(BroadcastTask)
+                .where(
+                    BroadcastTask.id == task_id,
+                    BroadcastTask.lease_owner == BroadcastService.worker_id,
+                )
+                .values(lease_owner=None, lease_until=None)
+            )
+            await session.commit()
+
+    @staticmethod
+    async def keep_lease(renew: Callable[[], Awaitable[bool]], stop_event: asyncio.Event, name: str):
+        """
+        Продлевает аренду каждые треть срока, пока не выставлен stop_event.
+        Аренду забрали — выставляет stop_event; продлить не удаётся —
+        выставляет его до истечения аренды, пока работа ещё наша.
+        """
+        loop = asyncio.get_running_loop()
+        interval = settings.broadcast_lease_seconds / 3
+        # Срок аренды по своим часам — от последнего успешного продления
+        lease_deadline = loop.time() + settings.broadcast_lease_seconds
+        while not stop_event.is_set():
+            await asyncio.sleep(interval)
+            try:
+                renewed = await asyncio.wait_for(renew(), timeout=interval)
+            except Exception as e:
+                logger.warning("%s: не удалось продлить аренду: %r", name, e)
+                # Следующая попытка может не успеть до конца аренды — останавливаемся,
+                # пока работа ещё наша и другой процесс не начал слать тем же получателям
+                if loop.time() + interval >= lease_deadline:
+                    stop_event.set()
+                continue
+            if not renewed:
+                stop_event.set()
+                return
+            lease_deadline = loop.time() + settings.broadcast_lease_seconds
+
+    @staticmethod
+    async def deliver(bot: Bot, task: BroadcastTask, user_id: int, kb, entities, delivery: Delivery):
+        """Отправляет содержимое рассылки одному пользователю (обычный путь aiogram)"""
+        for method in broadcast_methods(task, user_id, kb, entities)[delivery.done:]:
+            await bot(method)
+            delivery.done += 1
+
+    @staticmethod
+    async def prepare_media(bot: Bot, task: BroadcastTask):
+        """
+        Загружает медиа в Telegram один раз и запоминает file_id,
+        чтобы Telegram не скачивал URL заново для каждого получателя
+        """
+        if task.source_message_ids or task.content_type not in ("photo", "video", "video_note"):
+            return
+        if not task.media or task.media_file_id:
+            return
+
+        # Черновики из конструктора уже содержат file_id
+        if not task.media.startswith(("http://", "https://")):
+            task.media_file_id = task.media
+            return
+
+        chat_id = task.created_by or (settings.admins[0] if settings.admins else None)
+        if not chat_id:
+            return
+
+        try:
+            if task.content_type == "photo":
+                message = await bot.send_photo(chat_id, task.media, disable_notification=True)
+                task.media_file_id = message.photo[-1].file_id
+            elif task.content_type == "video":
+                message = await bot.send_video(chat_id, task.media, disable_notification=True)
+                task.media_file_id = message.video.file_id
+            else:
+                message = await bot.send_video_note(chat_id, task.media, disable_notification=True)
+                task.media_file_id = message.video_note.file_id
+        except Exception as e:
+            logger.warning("Рассылка #%s: не удалось загрузить медиа заранее: %s", task.id, e)
+            return
 
-                user_id = row[0]
+        try:
+            await bot.delete_message(chat_id, message.message_id)
+        except Exception:
+            pass
+
+    @staticmethod
+    async def deliver_with_retry(
+        send: Callable[[int, Delivery], Awaitable[None]],
+        task: BroadcastTask,
+        user_id: int,
+        limiter: AdaptiveRateLimiter,
+        stop_event: asyncio.Event | None = None,
+    ) -> bool:
+        """
+        Отправка под адаптивным лимитером: на флуд-лимит ждём retry_after
+        и повторяем тому же пользователю, а не засчитываем его как ошибку.
+        Общий лимит бота берётся в полосе рассылок на каждый запрос —
+        в SessionRateLimiter или в PreparedBroadcast.
+        False — рассылку остановили, пока ждали слот: пользователь не обработан
+        """
+        # Повтор продолжает с запроса, на котором поймали флуд-лимит
+        delivery = Delivery()
+        for attempt in range(1, MAX_RETRY_AFTER_ATTEMPTS + 1):
+            if not await limiter.acquire(stop_event):
+                return False
+            try:
+                await send(user_id, delivery)
+            except TelegramRetryAfter as e:
+                limiter.on_retry_after(e.retry_after)
+                logger.warning(
+                    "Рассылка #%s: флуд-лимит %s сек, скорость снижена до %.1f/сек",
+                    task.id, e.retry_after, limiter.rate,
+                )
+                if attempt == MAX_RETRY_AFTER_ATTEMPTS:
+                    raise
+            else:
+                limiter.on_success()
+                return True
+
+    # ------------------------- конвейер отправки -------------------------
+    @staticmethod
+    async def run_pool(
+        bot: Bot,
+        task: BroadcastTask,
+        progress,
+        stop_event: asyncio.Event,
+        save: Callable[[], Awaitable[None]],
+        upper_id: int | None = None,
+    ):
+        """
+        Пул воркеров поверх снимка аудитории.
+
+        Producer читает получателей пачками после progress.last_user_id
+        (и не дальше upper_id), воркеры отправляют параллельно под общим
+        адаптивным лимитом. Счётчики sent/failed и курсор last_user_id
+        пишутся в progress — это сама рассылка или её чанк.
+        """
+        blocked_buffer = []
 
+        # Курсор двигаем только по непрерывному префиксу обработанных id,
+        # иначе после рестарта потеряем тех, кто ещё был в работе
+        dispatched: deque[int] = deque()
+        processed: set[int] = set()
+
+        def advance_cursor(user_id: int):
+            processed.add(user_id)
+            while dispatched and dispatched[0] in processed:
+                progress.last_user_id = dispatched.popleft()
+                processed.discard(progress.last_user_id)
+
+        concurrency = max(1, settings.broadcast_concurrency)
+        limiter = AdaptiveRateLimiter(
+            settings.broadcast_rate,
+            min_rate=settings.broadcast_min_rate,
+        )
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        flush_lock = asyncio.Lock()
+
+        # Подготавливаем keyboard и entities один раз, а на быстром пути —
+        # сразу готовые тела запросов, где на отправку меняется только chat_id
+        kb, entities = BroadcastService.build_keyboard_and_entities(task)
+        prepared = None
+        if settings.broadcast_fast_path:
+            prepared = PreparedBroadcast.build(bot, task, kb, entities)
+
+        async def send(user_id: int, delivery: Delivery):
+            if prepared:
+                await prepared.send(user_id, delivery)
+            else:
+                await BroadcastService.deliver(bot, task, user_id, kb, entities, delivery)
+
+        async def flush():
+            async with flush_lock:
+                buffer = blocked_buffer.copy()
+                blocked_buffer.clear()
                 try:
-                    if task.content_type == "text":
-                        await bot.send_message(
-                            user_id,
-                            text=task.text,
-                            entities=entities,
-                            reply_markup=kb
-                        )
-                    elif task.content_type == "photo":
-                        await bot.send_photo(
-                            user_id,
-                            task.media,
-                            caption=task.text,
-                            caption_entities=entities,
-                            reply_markup=kb
-                        )
-                    elif task.content_type == "video":
-                        await bot.send_video(
-                            user_id,
-                            task.media,
-                            caption=task.text,
-                            caption_entities=entities,
-                            reply_markup=kb
-                        )
-                    elif task.content_type == "video_note":
-                        await bot.send_video_note(user_id, task.media)
-                        if task.text:
-                            await bot.send_message(
-                                user_id,
-                                text=task.text,
-                                entities=entities,
-                                reply_markup=kb
-                            )
-
-                    task.sent += 1
+                    await BroadcastService.mark_blocked_bulk(buffer)
+                except Exception:
+                    # Вернём в буфер — запишем при следующем сбросе
+                    blocked_buffer.extend(buffer)
+                    raise
+                await save()
+
+        async def enqueue(item, stoppable: bool = True) -> bool:
+            """
+            Кладёт в очередь, не зависая на полной: False — рассылку
+            остановили (если stoppable) или разбирать очередь больше некому
+            """
+            if not queue.full():
+                queue.put_nowait(item)
+                return True
+            put = asyncio.ensure_future(queue.put(item))
+            waiters = {put}
+            if stoppable:
+                waiters.add(asyncio.ensure_future(stop_event.wait()))
+            try:
+                while not put.done():
+                    alive = [worker_task for worker_task in workers if not worker_task.done()]
+                    if not alive or (stoppable and stop_event.is_set()):
+                        return False
+                    await asyncio.wait({*waiters, *alive}, return_when=asyncio.FIRST_COMPLETED)
+                return True
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+        async def worker():
+            while True:
+                user_id = await queue.get()
+                if user_id is None:
+                    return
+                # После остановки просто вычитываем очередь, курсор не двигаем
+                if stop_event.is_set():
+                    continue
+
+                try:
+                    if not await BroadcastService.deliver_with_retry(
+                        send, task, user_id, limiter, stop_event
+                    ):
+                        # Остановили в ожидании слота — курсор на нём не двигаем
+                        continue
+                    progress.sent += 1
 
                 except TelegramForbiddenError:
-                    task.failed += 1
+                    progress.failed += 1
                     blocked_buffer.append(user_id)
 
                 except TelegramBadRequest:
-                    task.failed += 1
+                    progress.failed += 1
                     # Можно фильтровать, но пока баним все BadRequest
                     blocked_buffer.append(user_id)
 
                 except Exception:
-                    task.failed += 1
+                    progress.failed += 1
+
+                advance_cursor(user_id)
 
                 # Батчим блокировки и прогресс каждые 500 отправок
-                if (task.sent + task.failed) % 500 == 0:
-                    await BroadcastService.mark_blocked_bulk(blocked_buffer)
-                    blocked_buffer.clear()
-                    await BroadcastService.save_progress(task)
+                if (progress.sent + progress.failed) % 500 == 0:
+                    try:
+                        await flush()
+                    except Exception:
+                        # Сбой БД не должен ронять воркер — повторим на следующем сбросе
+                        logger.exception("Рассылка #%s: не удалось сохранить прогресс", task.id)
+
+        # Воркеры шлют в полосе рассылок — контекст копируется при создании задач
+        lane_token = send_lane.set(Lane.BULK)
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        send_lane.reset(lane_token)
+        cancelled = False
+        try:
+            # Читаем снимок пачками по возрастанию id начиная с курсора,
+            # каждая пачка — отдельная короткая транзакция
+            after_id = progress.last_user_id
+            while not stop_event.is_set():
+                batch = await BroadcastService.fetch_recipients(
+                    task.id, after_id, RECIPIENTS_BATCH_SIZE, upper_id
+                )
+                if not batch:
+                    break
 
-        # Сохраняем остаток буфера и финальный прогресс
+                for user_id in batch:
+                    if stop_event.is_set():
+                        break
+                    dispatched.append(user_id)
+                    if not await enqueue(user_id):
+                        break
+                else:
+                    after_id = batch[-1]
+                    continue
+                # Остановили или все воркеры упали — дальше не читаем
+                break
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            if cancelled:
+                # Дедлайн остановки процесса: прерываем и воркеров, курсор
+                # уже стоит только на завершённых отправках
+                for worker_task in workers:
+                    worker_task.cancel()
+            else:
+                for _ in workers:
+                    if not await enqueue(None, stoppable=False):
+                        break
+            await asyncio.gather(*workers, return_exceptions=cancelled)
+
+        # Сохраняем остаток буфера блокировок
         await BroadcastService.mark_blocked_bulk(blocked_buffer)
-        blocked_buffer.clear()
 
-        if task.status != "stopped":
-            task.status = "done"
-        await BroadcastService.save_progress(task)
+    @staticmethod
+    def start_progress_reporter(
+        bot: Bot,
+        task: BroadcastTask,
+        read_progress: Callable[[], Awaitable[tuple[int, int, str]]],
+        done: asyncio.Event,
+    ) -> asyncio.Task | None:
+        """Запускает обновление статуса в чате админа, запустившего рассылку"""
+        if not task.created_by:
+            return None
+
+        async def read_status():
+            sent, failed, status = await read_progress()
+            # Процесс останавливается: в БД рассылка остаётся sending, у админа — пауза
+            if status == "sending" and BroadcastService.shutting_down:
+                status = "paused"
+            return sent, failed, status
+
+        reporter = BroadcastProgressReporter(
+            bot, task.created_by, task.id, task.total or 0, read_status
+        )
+        return detached_task(reporter.run(done), name=f"broadcast-progress-{task.id}")
+
+    # ------------------------- основной метод -------------------------
+    @staticmethod
+    async def send_task(bot: Bot, task: BroadcastTask, resume: bool = False):
+        """
+        Рассылка по снимку аудитории (broadcast_recipients) в порядке telegram_id.
+        При resume=True продолжает с сохранённого курсора last_user_id,
+        не сбрасывая счётчики.
+        В режиме settings.broadcast_sharded только нарезает аудиторию на чанки,
+        которые разбирают воркеры всех процессов.
+        Рассылку шлёт только процесс, взявший её в аренду (claim_task).
+        """
+        if not await BroadcastService.claim_task(task.id):
+            logger.info("Рассылка #%s уже идёт в другом процессе", task.id)
+            return
+
+        task.status = "sending"
+        if not resume:
+            task.sent = 0
+            task.failed = 0
+            task.last_user_id = None
+
+        # Загружаем медиа один раз до старта воркеров
+        await BroadcastService.prepare_media(bot, task)
+
+        # Фиксируем аудиторию; при продолжении используем уже снятый снимок
+        if not resume or not await BroadcastService.has_recipients(task.id):
+            total = await BroadcastService.materialize_recipients(task)
+            if not resume or not task.total:
+                task.total = total
+
+        async with SessionLocal() as session:
+            session.add(task)
+            await session.commit()
+
+        if settings.broadcast_sharded:
+            from services.broadcast_shards import BroadcastShardService
+            await BroadcastShardService.create_chunks(task)
+            # Дальше чанки арендуются по отдельности
+            await BroadcastService.release_task(task.id)
+            BroadcastShardService.watch_progress(bot, task)
+            return
+
+        stop_event = asyncio.Event()
+        BroadcastService.stop_flags[task.id] = stop_event
+
+        # Живой статус у админа читает счётчики прямо из памяти
+        async def read_progress():
+            return task.sent, task.failed, task.status
+
+        reporter_done = asyncio.Event()
+        reporter = BroadcastService.start_progress_reporter(
+            bot, task, read_progress, reporter_done
+        )
+
+        lease_lost = False
+
+        async def save():
+            nonlocal lease_lost
+            if not await BroadcastService.save_progress(task):
+                # Аренду перехватили — курсор теперь ведёт другой процесс
+                lease_lost = True
+                stop_event.set()
+
+        async def renew() -> bool:
+            nonlocal lease_lost
+            lease_lost = not await BroadcastService.claim_task(task.id)
+            return not lease_lost
+
+        heartbeat = asyncio.create_task(
+            BroadcastService.keep_lease(renew, stop_event, f"Рассылка #{task.id}")
+        )
+        try:
+            await BroadcastService.run_pool(bot, task, task, stop_event, save)
+            if not stop_event.is_set():
+                task.status = "done"
+            elif not BroadcastService.shutting_down and not lease_lost:
+                task.status = "stopped"
+        finally:
+            BroadcastService.stop_flags.pop(task.id, None)
+            heartbeat.cancel()
+            reporter_done.set()
+            # Курсор сохраняем и при отмене по дедлайну остановки,
+            # иначе отправленное после последнего сброса уйдёт повторно
+            await asyncio.shield(BroadcastService.save_progress(task, release=True))
+
+        if lease_lost:
+            logger.warning("Рассылка #%s: аренду перехватил другой процесс", task.id)
+
+        if reporter:
+            await reporter
+
+        # Снимок нужен только для продолжения — после завершения он не нужен
+        if task.status == "done":
+            await BroadcastService.drop_recipients(task.id)
+
+    @staticmethod
+    async def resume_task(bot: Bot, task_id: int) -> bool:
+        """Продолжает рассылку с сохранённого курсора"""
+        if task_id in BroadcastService.stop_flags:
+            return False
+
+        async with SessionLocal() as session:
+            task = await session.get(BroadcastTask, task_id)
+        if not task or task.status == "done":
+            return False
+
+        from services.broadcast_shards import BroadcastShardService
+        if await BroadcastShardService.has_chunks(task_id):
+            await BroadcastShardService.resume(task_id)
+            BroadcastShardService.watch_progress(bot, task)
+            return True
 
-        BroadcastService.stop_flags.pop(task.id, None)
+        # Рассылку может слать другой процесс: stop_flags видят только свой
+        if not await BroadcastService.claim_task(task_id):
+            return False
+
+        return supervisor.spawn(
+            BroadcastService.send_task(bot, task, resume=True), name=f"broadcast-{task_id}"
+        ) is not None
+
+    @staticmethod
+    async def resume_unfinished(bot: Bot):
+        """
+        Поднимает рассылки, прерванные рестартом процесса
+        (остались в статусе sending/pending).
+        Рассылки в аренде у другого процесса не трогаем, а ждём:
+        если тот упал, аренда истечёт и рассылку подхватим здесь.
+        """
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(BroadcastTask.id)
+                .where(BroadcastTask.status.in_(["pending", "sending"]))
+            )
+            task_ids = result.scalars().all()
+
+        for task_id in task_ids:
+            if await BroadcastService.resume_task(bot, task_id):
+                logger.info("Продолжаем рассылку #%s после рестарта", task_id)
+            else:
+                supervisor.spawn(
+                    BroadcastService.resume_when_free(bot, task_id),
+                    name=f"broadcast-resume-{task_id}",
+                )
+
+    @staticmethod
+    async def resume_when_free(bot: Bot, task_id: int):
+        """Подхватывает рассылку, когда истечёт аренда другого процесса"""
+        while not await supervisor.sleep(settings.broadcast_lease_seconds):
+            async with SessionLocal() as session:
+                status = await session.scalar(
+                    select(BroadcastTask.status).where(BroadcastTask.id == task_id)
+                )
+            if status not in ("pending", "sending") or task_id in BroadcastService.stop_flags:
+                return
+            if await BroadcastService.resume_task(bot, task_id):
+                logger.info("Рассылка #%s: аренда истекла, продолжаем", task_id)
+                return
+
+    @staticmethod
+    def checkpoint_all():
+        """Хук остановки процесса: рассылки дописывают прогресс и выходят"""
+        BroadcastService.shutting_down = True
+        for stop_event in BroadcastService.stop_flags.values():
+            stop_event.set()
 
     @staticmethod
     async def stop_task(task_id: int):
@@ -0,0 +1,143 @@
+# bot/services/broadcast_payload.py
+import asyncio
+import json
+
+from aiohttp import ClientError
+from aiogram import Bot
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.methods import (
+    TelegramMethod,
+    SendMessage,
+    SendPhoto,
+    SendVideo,
+    SendVideoNote,
+    CopyMessage,
+    CopyMessages,
+)
+
+from models.broadcast_task import BroadcastTask
+from utils.priority_limiter import outgoing_limiter
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class Delivery:
+    """
+    Сколько запросов доставки одному получателю уже прошло. Сообщение
+    бывает из нескольких запросов (кружок + текст) — повтор после
+    флуд-лимита продолжает с упавшего, а не шлёт кружок второй раз
+    """
+
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = 0
+
+
+def broadcast_methods(task: BroadcastTask, chat_id: int, kb, entities) -> list[TelegramMethod]:
+    """Запросы к Bot API, которыми рассылка доставляется одному получателю"""
+    media = task.media_file_id or task.media
+
+    if task.source_message_ids:
+        if len(task.source_message_ids) == 1:
+            return [CopyMessage(
+                chat_id=chat_id,
+                from_chat_id=task.source_chat_id,
+                message_id=task.source_message_ids[0],
+                reply_markup=kb,
+            )]
+        return [CopyMessages(
+            chat_id=chat_id,
+            from_chat_id=task.source_chat_id,
+            message_ids=task.source_message_ids,
+        )]
+
+    if task.content_type == "text":
+        return [SendMessage(chat_id=chat_id, text=task.text, entities=entities, reply_markup=kb)]
+    if task.content_type == "photo":
+        return [SendPhoto(
+            chat_id=chat_id,
+            photo=media,
+            caption=task.text,
+            caption_entities=entities,
+            reply_markup=kb,
+        )]
+    if task.content_type == "video":
+        return [SendVideo(
+            chat_id=chat_id,
+            video=media,
+            caption=task.text,
+            caption_entities=entities,
+            reply_markup=kb,
+        )]
+    if task.content_type == "video_note":
+        methods = [SendVideoNote(chat_id=chat_id, video_note=media)]
+        if task.text:
+            methods.append(SendMessage(chat_id=chat_id, text=task.text, entities=entities, reply_markup=kb))
+        return methods
+    return []
+
+
+class PreparedBroadcast:
+    """
+    Тела запросов рассылки, сериализованные один раз на задачу.
+
+    aiogram на каждый send_* заново валидирует клавиатуру и entities через
+    pydantic и собирает multipart-форму, хотя для всех получателей они одни
+    и те же. Здесь JSON без chat_id собирается заранее, а на отправку
+    остаётся склеить b'{"chat_id":<id>' с готовым хвостом.
+    Запросы идут мимо сессии aiogram, поэтому общий лимит бота
+    берётся здесь же — в полосе текущей задачи.
+    Ответ разбирается через aiogram только при ошибке — так исключения
+    (TelegramRetryAfter, TelegramForbiddenError, ...) остаются прежними.
+    """
+
+    def __init__(self, bot: Bot, requests: list[tuple[TelegramMethod, str, bytes]]):
+        self.bot = bot
+        # (метод для разбора ошибок, url, хвост тела после chat_id)
+        self.requests = requests
+
+    @classmethod
+    def build(cls, bot: Bot, task: BroadcastTask, kb, entities) -> "PreparedBroadcast | None":
+        requests = []
+        for method in broadcast_methods(task, 0, kb, entities):
+            files = {}
+            payload = {}
+            for key, value in method.model_dump(warnings=False).items():
+                if key == "chat_id":
+                    continue
+                value = bot.session.prepare_value(value, bot=bot, files=files, _dumps_json=False)
+                if value is not None:
+                    payload[key] = value
+            # Файлы (InputFile) так не отправить — остаёмся на обычном пути
+            if files:
+                return None
+
+            body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+            tail = ("," + body[1:] if payload else "}").encode()
+            url = bot.session.api.api_url(token=bot.token, method=method.__api_method__)
+            requests.append((method, url, tail))
+
+        return cls(bot, requests) if requests else None
+
+    async def send(self, chat_id: int, delivery: Delivery | None = None):
+        delivery = delivery or Delivery()
+        session = await self.bot.session.create_session()
+        head = b'{"chat_id":' + str(chat_id).encode()
+
+        for method, url, tail in self.requests[delivery.done:]:
+            await outgoing_limiter.acquire()
+            try:
+                async with session.post(
+                    url, data=head + tail, headers=JSON_HEADERS, timeout=self.bot.session.timeout
+                ) as resp:
+                    raw = await resp.read()
+            except asyncio.TimeoutError:
+                raise TelegramNetworkError(method=method, message="Request timeout error")
+            except ClientError as e:
+                raise TelegramNetworkError(method=method, message=f"{type(e).__name__}: {e}")
+
+            if not (resp.status == 200 and raw.startswith(b'{"ok":true')):
+                # Ошибку разбираем штатно — aiogram поднимет нужное исключение
+                self.bot.session.check_response(self.bot, method, resp.status, raw.decode())
+            delivery.done += 1
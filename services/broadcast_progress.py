@@ -0,0 +1,102 @@
+# bot/services/broadcast_progress.py
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Callable, Awaitable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest
+
+from config import settings
+from utils.broadcast_formatting import broadcast_progress_text
+
+logger = logging.getLogger(__name__)
+
+# Вес последнего замера в сглаженной скорости
+SPEED_EWMA_ALPHA = 0.3
+
+
+class BroadcastProgressReporter:
+    """
+    Держит одно сообщение со статусом рассылки в чате админа и редактирует его
+    не чаще раза в settings.broadcast_progress_interval секунд — правки почти
+    не тратят лимит Telegram и не мешают самой рассылке.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        chat_id: int,
+        task_id: int,
+        total: int,
+        read_progress: Callable[[], Awaitable[tuple[int, int, str]]],
+    ):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.task_id = task_id
+        self.total = total
+        # Возвращает (sent, failed, status)
+        self.read_progress = read_progress
+
+        self.message_id: int | None = None
+        self.speed = 0.0
+        self._last_text: str | None = None
+        self._last_processed: int | None = None
+        self._last_time: float | None = None
+
+    def _update_speed(self, processed: int):
+        now = asyncio.get_running_loop().time()
+        if self._last_time is not None and now > self._last_time:
+            instant = (processed - self._last_processed) / (now - self._last_time)
+            if self.speed:
+                self.speed = SPEED_EWMA_ALPHA * instant + (1 - SPEED_EWMA_ALPHA) * self.speed
+            else:
+                self.speed = instant
+        self._last_processed = processed
+        self._last_time = now
+
+    async def refresh(self):
+        sent, failed, status = await self.read_progress()
+        processed = sent + failed
+        self._update_speed(processed)
+
+        eta = None
+        if self.speed > 0:
+            eta = timedelta(seconds=max(self.total - processed, 0) / self.speed)
+
+        text = broadcast_progress_text(
+            self.task_id, status, sent, failed, self.total, self.speed, eta
+        )
+        if text == self._last_text:
+            return
+
+        if self.message_id is None:
+            message = await self.bot.send_message(
+                self.chat_id, text, parse_mode="HTML", disable_notification=True
+            )
+            self.message_id = message.message_id
+        else:
+            await self.bot.edit_message_text(
+                text=text, chat_id=self.chat_id, message_id=self.message_id, parse_mode="HTML"
+            )
+        self._last_text = text
+
+    async def run(self, done: asyncio.Event):
+        """Обновляет статус, пока не выставлен done, затем пишет финальный"""
+        interval = settings.broadcast_progress_interval
+        while True:
+            try:
+                await self.refresh()
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                logger.warning("Рассылка #%s: не удалось обновить статус: %s", self.task_id, e)
+            except Exception:
+                logger.exception("Рассылка #%s: ошибка обновления статуса", self.task_id)
+
+            if done.is_set():
+                return
+            try:
+                await asyncio.wait_for(done.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,277 @@
+# bot/services/broadcast_shards.py
+import asyncio
+import logging
+
+from aiogram import Bot
+from sqlalchemy import select, update, delete, func, or_, exists
+
+from config import settings
+from db import SessionLocal
+from models.broadcast_chunk import BroadcastChunk
+from models.broadcast_recipient import BroadcastRecipient
+from models.broadcast_task import BroadcastTask
+from services.broadcast import BroadcastService
+from utils.task_supervisor import supervisor
+
+logger = logging.getLogger(__name__)
+
+# Как часто свободный воркер ищет новые чанки
+SHARD_POLL_INTERVAL = 5
+
+
+class BroadcastShardService:
+    """
+    Рассылка несколькими процессами.
+
+    Снимок аудитории режется на диапазоны telegram_id (broadcast_chunks).
+    Каждый процесс крутит run_worker: берёт чанк в аренду через
+    SELECT ... FOR UPDATE SKIP LOCKED, продлевает аренду, пока шлёт,
+    и складывает прирост sent/failed в broadcast_tasks.
+    Остановка идёт через broadcast_tasks.status, а не через память процесса.
+    """
+
+    worker_id = BroadcastService.worker_id
+    # Флаги остановки чанков, которые сейчас отрабатывает этот процесс
+    running: set[asyncio.Event] = set()
+
+    @staticmethod
+    async def has_chunks(task_id: int) -> bool:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(exists().where(BroadcastChunk.task_id == task_id))
+            )
+            return bool(result.scalar())
+
+    @staticmethod
+    async def create_chunks(task: BroadcastTask):
+        """Нарезает снимок аудитории на диапазоны по broadcast_chunk_size получателей"""
+        if await BroadcastShardService.has_chunks(task.id):
+            return
+
+        numbered = (
+            select(
+                BroadcastRecipient.telegram_id,
+                func.row_number().over(order_by=BroadcastRecipient.telegram_id).label("rn"),
+            )
+            .where(BroadcastRecipient.task_id == task.id)
+            .subquery()
+        )
+
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(numbered.c.telegram_id)
+                .where((numbered.c.rn - 1) % settings.broadcast_chunk_size == 0)
+                .order_by(numbered.c.telegram_id)
+            )
+            starts = result.scalars().all()
+
+            for i, start_id in enumerate(starts):
+                end_id = starts[i + 1] - 1 if i + 1 < len(starts) else None
+                session.add(BroadcastChunk(
+                    task_id=task.id,
+                    start_id=start_id,
+                    end_id=end_id,
+                    last_user_id=start_id - 1,
+                    status="pending",
+                    sent=0,
+                    failed=0,
+                ))
+            await session.commit()
+
+        logger.info("Рассылка #%s: %s чанков", task.id, len(starts))
+
+        # Пустая аудитория — завершать нечего ждать
+        if not starts:
+            await BroadcastShardService.finish_if_complete(task.id)
+
+    @staticmethod
+    async def claim_chunk() -> BroadcastChunk | None:
+        """Берёт в аренду свободный чанк активной рассылки"""
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(BroadcastChunk)
+                .join(BroadcastTask, BroadcastTask.id == BroadcastChunk.task_id)
+                .where(
+                    BroadcastTask.status == "sending",
+                    BroadcastChunk.status != "done",
+                    or_(
+                        BroadcastChunk.lease_until.is_(None),
+                        BroadcastChunk.lease_until < func.now(),
+                    ),
+                )
+                .order_by(BroadcastChunk.id)
+                .limit(1)
+                .with_for_update(skip_locked=True, of=BroadcastChunk)
+            )
+            chunk = result.scalar_one_or_none()
+            if chunk is None:
+                return None
+
+            chunk.status = "leased"
+            chunk.lease_owner = BroadcastShardService.worker_id
+            chunk.lease_until = func.now() + BroadcastService.lease_duration()
+            await session.commit()
+            await session.refresh(chunk)
+            return chunk
+
+    @staticmethod
+    async def renew_lease(chunk: BroadcastChunk) -> bool:
+        """Продлевает аренду; False — чанк у нас забрали или рассылку остановили"""
+        async with SessionLocal() as session:
+            result = await session.execute(
+                update(BroadcastChunk)
+                .where(
+                    BroadcastChunk.id == chunk.id,
+                    BroadcastChunk.lease_owner == BroadcastShardService.worker_id,
+                )
+                .values(lease_until=func.now() + BroadcastService.lease_duration())
+            )
+            status = await session.scalar(
+                select(BroadcastTask.status).where(BroadcastTask.id == chunk.task_id)
+            )
+            await session.commit()
+        return result.rowcount == 1 and status == "sending"
+
+    @staticmethod
+    async def process_chunk(bot: Bot, chunk: BroadcastChunk):
+        async with SessionLocal() as session:
+            task = await session.get(BroadcastTask, chunk.task_id)
+        if task is None:
+            return
+
+        stop_event = asyncio.Event()
+        reported = {"sent": chunk.sent, "failed": chunk.failed}
+
+        async def save(status: str | None = None):
+            # Прогресс чанка и прирост счётчиков рассылки — одной транзакцией,
+            # чтобы перехвативший чанк процесс не посчитал отправки дважды
+            d_sent = chunk.sent - reported["sent"]
+            d_failed = chunk.failed - reported["failed"]
+            values = dict(sent=chunk.sent, failed=chunk.failed, last_user_id=chunk.last_user_id)
+            if status:
+                values.update(status=status, lease_owner=None, lease_until=None)
+
+            async with SessionLocal() as session:
+                result = await session.execute(
+                    update(BroadcastChunk)
+                    .where(
+                        BroadcastChunk.id == chunk.id,
+                        BroadcastChunk.lease_owner == BroadcastShardService.worker_id,
+                    )
+                    .values(**values)
+                )
+                # Аренду уже перехватили — прогресс теперь считает новый владелец
+                if result.rowcount == 0:
+                    stop_event.set()
+                    return
+                if d_sent or d_failed:
+                    await session.execute(
+                        update(BroadcastTask)
+                        .where(BroadcastTask.id == chunk.task_id)
+                        .values(
+                            sent=BroadcastTask.sent + d_sent,
+                            failed=BroadcastTask.failed + d_failed,
+                        )
+                    )
+                await session.commit()
+            reported.update(sent=chunk.sent, failed=chunk.failed)
+
+        heartbeat_task = asyncio.create_task(BroadcastService.keep_lease(
+            lambda: BroadcastShardService.renew_lease(chunk), stop_event, f"Чанк #{chunk.id}"
+        ))
+        BroadcastShardService.running.add(stop_event)
+        try:
+            await BroadcastService.run_pool(
+                bot, task, chunk, stop_event, save, upper_id=chunk.end_id
+            )
+        except asyncio.CancelledError:
+            # Дедлайн остановки процесса — чанк возвращаем в пул ниже
+            stop_event.set()
+            raise
+        finally:
+            BroadcastShardService.running.discard(stop_event)
+            heartbeat_task.cancel()
+            # Остановленный чанк возвращаем в пул с курсором — его доделают после продолжения
+            await asyncio.shield(save(status="pending" if stop_event.is_set() else "done"))
+
+        if not stop_event.is_set():
+            await BroadcastShardService.finish_if_complete(chunk.task_id)
+
+    @staticmethod
+    async def finish_if_complete(task_id: int):
+        """Закрывает рассылку, когда все её чанки отработаны"""
+        async with SessionLocal() as session:
+            result = await session.execute(
+                update(BroadcastTask)
+                .where(
+                    BroadcastTask.id == task_id,
+                    BroadcastTask.status == "sending",
+                    ~exists().where(
+                        BroadcastChunk.task_id == task_id,
+                        BroadcastChunk.status != "done",
+                    ),
+                )
+                .values(status="done")
+            )
+            if result.rowcount:
+                await session.execute(
+                    delete(BroadcastRecipient).where(BroadcastRecipient.task_id == task_id)
+                )
+            await session.commit()
+
+        if result.rowcount:
+            logger.info("Рассылка #%s завершена", task_id)
+
+    @staticmethod
+    async def resume(task_id: int):
+        """Возвращает остановленную рассылку в работу — чанки подхватят воркеры"""
+        async with SessionLocal() as session:
+            await session.execute(
+                update(BroadcastTask)
+                .where(BroadcastTask.id == task_id)
+                .values(status="sending")
+            )
+            await session.commit()
+
+    @staticmethod
+    def watch_progress(bot: Bot, task: BroadcastTask) -> asyncio.Task | None:
+        """
+        Живой статус шардированной рассылки: счётчики складываются
+        воркерами разных процессов, поэтому читаем их из broadcast_tasks
+        """
+        done = asyncio.Event()
+
+        async def read_progress():
+            async with SessionLocal() as session:
+                row = (await session.execute(
+                    select(BroadcastTask.sent, BroadcastTask.failed, BroadcastTask.status)
+                    .where(BroadcastTask.id == task.id)
+                )).one()
+            if row.status != "sending":
+                done.set()
+            return row.sent, row.failed, row.status
+
+        return BroadcastService.start_progress_reporter(bot, task, read_progress, done)
+
+    @staticmethod
+    def checkpoint_all():
+        """Хук остановки процесса: чанки возвращаются в пул с курсором"""
+        for stop_event in BroadcastShardService.running:
+            stop_event.set()
+
+    @staticmethod
+    async def run_worker(bot: Bot):
+        """Цикл воркера до остановки процесса: берём чанк, отрабатываем, ищем следующий"""
+        logger.info("Воркер рассылок %s запущен", BroadcastShardService.worker_id)
+        while supervisor.accepting:
+            try:
+                chunk = await BroadcastShardService.claim_chunk()
+                if chunk is None:
+                    await asyncio.sleep(SHARD_POLL_INTERVAL)
+                    continue
+                await BroadcastShardService.process_chunk(bot, chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка воркера рассылок")
+                await asyncio.sleep(SHARD_POLL_INTERVAL)
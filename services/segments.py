@@ -0,0 +1,129 @@
+# bot/services/segments.py
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, func, exists, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.users import User
+from models.user_transaction import UserTransaction
+from models.promo import PromoLink, PromoReferral
+from models.user_gift import UserGift, GiftStatus
+from models.star_invoice import StarsInvoice
+
+
+# Готовые сегменты для конструктора рассылки: ключ → (название, определение)
+SEGMENT_PRESETS = {
+    "all": ("👥 Все пользователи", None),
+    "deposit_30d": ("💰 Депозит за 30 дней", {"deposited_within_days": 30}),
+    "stars_30d": ("⭐ Пополняли звёзды за 30 дней", {"paid_stars_within_days": 30}),
+    "gifts": ("🎁 Есть доступные подарки", {"has_available_gifts": True}),
+    "no_deposit": ("🆕 Ни разу не пополняли", {"never_deposited": True}),
+}
+
+
+class SegmentService:
+    """
+    Сегменты аудитории рассылки.
+
+    Определение сегмента — dict, который хранится в broadcast_tasks.segment:
+        deposited_within_days: int   — был депозит в user_transactions за N дней
+        never_deposited: bool        — ни одного депозита
+        paid_stars_within_days: int  — оплаченный stars_invoice за N дней
+        has_available_gifts: bool    — есть подарок в статусе AVAILABLE
+        promo_id: int                — пришёл по промо-ссылке
+    Все условия объединяются через AND и компилируются в один запрос
+    по users с коррелированными EXISTS — каждый идёт по индексу user_id.
+    """
+
+    @staticmethod
+    def conditions(segment: dict | None) -> list:
+        if not segment:
+            return []
+
+        now = datetime.now(timezone.utc)
+        conditions = []
+
+        if segment.get("deposited_within_days"):
+            since = now - timedelta(days=int(segment["deposited_within_days"]))
+            conditions.append(exists().where(
+                UserTransaction.user_id == User.telegram_id,
+                UserTransaction.type == "deposit",
+                UserTransaction.created_at >= since,
+            ))
+
+        if segment.get("never_deposited"):
+            conditions.append(~exists().where(
+                UserTransaction.user_id == User.telegram_id,
+                UserTransaction.type == "deposit",
+            ))
+
+        if segment.get("paid_stars_within_days"):
+            since = now - timedelta(days=int(segment["paid_stars_within_days"]))
+            conditions.append(exists().where(
+                StarsInvoice.telegram_id == User.telegram_id,
+                StarsInvoice.status == "paid",
+                StarsInvoice.created_at >= since,
+            ))
+
+        if segment.get("has_available_gifts"):
+            conditions.append(exists().where(
+                UserGift.user_id == User.telegram_id,
+                UserGift.status == GiftStatus.AVAILABLE,
+            ))
+
+        if segment.get("promo_id"):
+            conditions.append(exists().where(
+                PromoReferral.user_id == User.telegram_id,
+                PromoReferral.promo_id == int(segment["promo_id"]),
+            ))
+
+        return conditions
+
+    @staticmethod
+    def recipients_query(segment: dict | None):
+        """SELECT telegram_id незаблокированных пользователей сегмента"""
+        return (
+            select(User.telegram_id)
+            .where(User.is_blocked.is_(False), *SegmentService.conditions(segment))
+        )
+
+    @staticmethod
+    async def count(session: AsyncSession, segment: dict | None) -> int:
+        result = await session.execute(
+            select(func.count())
+            .select_from(User)
+            .where(and_(User.is_blocked.is_(False), *SegmentService.conditions(segment)))
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    async def promo_segment(session: AsyncSession, code: str) -> dict | None:
+        """Сегмент «пришли по промо-ссылке» по её коду"""
+        promo_id = await session.scalar(
+            select(PromoLink.id).where(PromoLink.code == code)
+        )
+        if promo_id is None:
+            return None
+        return {"promo_id": promo_id, "promo_code": code}
+
+    @staticmethod
+    def describe(segment: dict | None) -> str:
+        if not segment:
+            return SEGMENT_PRESETS["all"][0]
+
+        for title, definition in SEGMENT_PRESETS.values():
+            if definition == segment:
+                return title
+
+        parts = []
+        if segment.get("deposited_within_days"):
+            parts.append(f"депозит за {segment['deposited_within_days']} дн")
+        if segment.get("never_deposited"):
+            parts.append("без депозитов")
+        if segment.get("paid_stars_within_days"):
+            parts.append(f"звёзды за {segment['paid_stars_within_days']} дн")
+        if segment.get("has_available_gifts"):
+            parts.append("есть подарки")
+        if segment.get("promo_id"):
+            parts.append(f"промо {segment.get('promo_code') or segment['promo_id']}")
+        return "🎯 " + ", ".join(parts)
@@ -1,6 +1,6 @@
 
 
-from sqlalchemy import desc, func, cast, BigInteger, case, and_, select
+from sqlalchemy import desc, func, cast, BigInteger, case, and_, select, true
 import pytz
 from datetime import datetime, timedelta, time
 from aiogram import Bot
@@ -25,133 +25,71 @@ def get_today_start_moscow_utc():
     return today_moscow.astimezone(pytz.UTC).replace(tzinfo=None)
 
 
-# 🔹 Статистика по режимам за все время
-async def get_games_statistics_all_time(session):
-    # Кейсы (user_spins)
-    spins_total = await session.execute(
-        select(func.count(UserSpin.id))
-    )
-    spins_count = spins_total.scalar() or 0
-
-    # Апгрейды подарков (user_gift_upgrades)
-    upgrades_total = await session.execute(
-        select(func.count(UserGiftUpgrade.id))
-    )
-    upgrades_count = upgrades_total.scalar() or 0
-
-    # Plinko игры
-    plinko_total = await session.execute(
-        select(func.count(PlinkoGame.id))
-    )
-    plinko_count = plinko_total.scalar() or 0
+# Игровые режимы: префикс ключа в статистике → модель
+GAME_MODELS = (
+    ("spins", UserSpin),  # Кейсы (user_spins)
+    ("upgrades", UserGiftUpgrade),  # Апгрейды подарков (user_gift_upgrades)
+    ("plinko", PlinkoGame),  # Plinko игры
+    ("wheel", WheelSpin),  # Колесо фортуны (wheel_spins)
+    ("fortune", FortuneSpin),  # Fortune spins
+)
+
+
+def games_columns(since=None):
+    """
+    Счётчики игр по режимам и сумма пополненных звезд — скалярными
+    подзапросами, чтобы всё считалось одним запросом к БД.
+    since=None — за все время (ключи *_total), иначе с этого момента (*_24h)
+    """
+    suffix = "24h" if since else "total"
+    columns = []
+    for name, model in GAME_MODELS:
+        stmt = select(func.count(model.id))
+        if since:
+            stmt = stmt.where(model.created_at >= since)
+        columns.append(stmt.scalar_subquery().label(f"{name}_{suffix}"))
+
+    stars = select(func.coalesce(func.sum(StarsInvoice.amount), 0)).where(StarsInvoice.status == 'paid')
+    if since:
+        stars = stars.where(StarsInvoice.created_at >= since)
+    columns.append(stars.scalar_subquery().label("stars_24h" if since else "total_stars"))
+    return columns
+
+
+def games_dict(row, since=None) -> dict:
+    """Статистика по режимам из строки с колонками games_columns"""
+    suffix = "24h" if since else "total"
+    stars_key = "stars_24h" if since else "total_stars"
+    games = {f"{name}_{suffix}": getattr(row, f"{name}_{suffix}") for name, _ in GAME_MODELS}
+    games["total_games_24h" if since else "total_games"] = sum(games.values())
+    games[stars_key] = getattr(row, stars_key)
+    return games
 
-    # Колесо фортуны (wheel_spins)
-    wheel_total = await session.execute(
-        select(func.count(WheelSpin.id))
-    )
-    wheel_count = wheel_total.scalar() or 0
 
-    # Fortune spins
-    fortune_total = await session.execute(
-        select(func.count(FortuneSpin.id))
-    )
-    fortune_count = fortune_total.scalar() or 0
-
-    # Звезды всего пополнено
-    stars_total = await session.execute(
-        select(func.sum(StarsInvoice.amount))
-        .where(StarsInvoice.status == 'paid')
-    )
-    total_stars = stars_total.scalar() or 0
-
-    return {
-        "spins_total": spins_count,
-        "upgrades_total": upgrades_count,
-        "plinko_total": plinko_count,
-        "wheel_total": wheel_count,  # Добавлено
-        "fortune_total": fortune_count,
-        "total_games": spins_count + upgrades_count + plinko_count + wheel_count + fortune_count,
-        "total_stars": total_stars
-    }
+# 🔹 Статистика по режимам за все время
+async def get_games_statistics_all_time(session):
+    result = await session.execute(select(*games_columns()))
+    return games_dict(result.one())
 
 
 # 🔹 Статистика по режимам за последние 24ч
 async def get_games_statistics_24h(session):
     # Начало сегодняшнего дня по МСК (00:00)
     today_start_utc = get_today_start_moscow_utc()
+    result = await session.execute(select(*games_columns(today_start_utc)))
+    return games_dict(result.one(), today_start_utc)
 
-    # Кейсы за 24ч
-    spins_24h = await session.execute(
-        select(func.count(UserSpin.id))
-        .where(UserSpin.created_at >= today_start_utc)
-    )
-    spins_count_24h = spins_24h.scalar() or 0
-
-    # Апгрейды подарков за 24ч
-    upgrades_24h = await session.execute(
-        select(func.count(UserGiftUpgrade.id))
-        .where(UserGiftUpgrade.created_at >= today_start_utc)
-    )
-    upgrades_count_24h = upgrades_24h.scalar() or 0
-
-    # Plinko игры за 24ч
-    plinko_24h = await session.execute(
-        select(func.count(PlinkoGame.id))
-        .where(PlinkoGame.created_at >= today_start_utc)
-    )
-    plinko_count_24h = plinko_24h.scalar() or 0
-
-    # Колесо фортуны за 24ч
-    wheel_24h = await session.execute(
-        select(func.count(WheelSpin.id))
-        .where(WheelSpin.created_at >= today_start_utc)
-    )
-    wheel_count_24h = wheel_24h.scalar() or 0
-
-    # Fortune spins за 24ч
-    fortune_24h = await session.execute(
-        select(func.count(FortuneSpin.id))
-        .where(FortuneSpin.created_at >= today_start_utc)
-    )
-    fortune_count_24h = fortune_24h.scalar() or 0
-
-    # Звезды пополнено за 24ч
-    stars_24h = await session.execute(
-        select(func.sum(StarsInvoice.amount))
-        .where(and_(
-            StarsInvoice.status == 'paid',
-            StarsInvoice.created_at >= today_start_utc
-        ))
-    )
-    stars_24h_sum = stars_24h.scalar() or 0
-
-    return {
-        "spins_24h": spins_count_24h,
-        "upgrades_24h": upgrades_count_24h,
-        "plinko_24h": plinko_count_24h,
-        "wheel_24h": wheel_count_24h,  # Добавлено
-        "fortune_24h": fortune_count_24h,
-        "total_games_24h": spins_count_24h + upgrades_count_24h + plinko_count_24h + wheel_count_24h + fortune_count_24h,
-        "stars_24h": stars_24h_sum
-    }
-
-
-# 🔹 Статистика за последние 24ч (обновленная с играми и звездами)
-async def get_statistics_24h(session):
-    # Начало сегодняшнего дня по МСК (00:00)
-    today_start_utc = get_today_start_moscow_utc()
 
+def statistics_24h_subqueries(since):
+    """Однострочные агрегаты по пользователям, ставкам и подаркам с момента since"""
     # Пользователи
-    users_data = await session.execute(
-        select(
-            func.count(User.telegram_id),
-            func.count(case((User.created_at >= today_start_utc, 1)))
-        )
-    )
-    total_users, new_users_24h = users_data.one()
+    users = select(
+        func.count(User.telegram_id).label("total_users"),
+        func.count(case((User.created_at >= since, 1))).label("new_users_24h")
+    ).subquery("users_stats")
 
     # Ставки за 24ч
-    bets_24h_result = await session.execute(
+    bets = (
         select(
             func.coalesce(func.sum(Bet.amount_cents), cast(0, BigInteger)).label("bets_sum"),
             func.coalesce(func.sum(case((Bet.cashed_out == True, Bet.win_cents), else_=0)), cast(0, BigInteger)).label(
@@ -161,58 +99,73 @@ async def get_statistics_24h(session):
             func.count(Bet.id).label("bets_count"),
             func.count(case((Bet.cashed_out == True, 1))).label("wins_count")
         )
-        .where(Bet.created_at >= today_start_utc)
-    )
-    bets_24h = bets_24h_result.one()
-    bets_sum = bets_24h.bets_sum
-    wins_sum = bets_24h.wins_sum
-    avg_multiplier = (bets_24h.avg_multiplier or 0) / 100  # bp → множитель
-    bets_count = bets_24h.bets_count
-    wins_count = bets_24h.wins_count
-
-    # RTP = выигрыш / ставки * 100
-    rtp = (wins_sum / bets_sum * 100) if bets_sum > 0 else 0
-    profit_total = bets_sum - wins_sum
-    profit_label = "Прибыль" if profit_total >= 0 else "Убыток"
+        .where(Bet.created_at >= since)
+    ).subquery("bets_stats")
 
     # Транзакции подарками за 24ч
-    gift_tx_result = await session.execute(
+    gift_tx = (
         select(
             func.count().label("gift_count"),
             func.coalesce(func.sum(case((UserTransaction.currency == 'gift', UserTransaction.amount), else_=0)),
                           0).label("gift_sum")
         )
-        .where(UserTransaction.created_at >= today_start_utc)
+        .where(UserTransaction.created_at >= since)
         .where(UserTransaction.currency == 'gift')
+    ).subquery("gift_stats")
+
+    return users, bets, gift_tx
+
+
+# 🔹 Статистика за последние 24ч (обновленная с играми и звездами)
+async def get_statistics_24h(session):
+    """
+    Пользователи, ставки, подарки и игры — одним запросом: агрегаты
+    по users, bets и user_transactions — однострочные подзапросы,
+    счётчики игр — скалярные подзапросы (раньше было 15 запросов к БД)
+    """
+    # Начало сегодняшнего дня по МСК (00:00)
+    today_start_utc = get_today_start_moscow_utc()
+    users, bets, gift_tx = statistics_24h_subqueries(today_start_utc)
+
+    # Подзапросы однострочные — соединение ничего не размножает
+    result = await session.execute(
+        select(
+            users, bets, gift_tx,
+            *games_columns(today_start_utc),
+            *games_columns(),
+        )
+        .select_from(users.join(bets, true()).join(gift_tx, true()))
     )
-    gift_tx = gift_tx_result.one()
-    gift_count = gift_tx.gift_count
-    gift_sum = gift_tx.gift_sum
+    row = result.one()
 
-    # Статистика по играм за 24ч
-    games_24h = await get_games_statistics_24h(session)
+    bets_sum = row.bets_sum
+    wins_sum = row.wins_sum
+    avg_multiplier = (row.avg_multiplier or 0) / 100  # bp → множитель
 
-    # Статистика по играм за все время
-    games_all_time = await get_games_statistics_all_time(session)
+    # RTP = выигрыш / ставки * 100
+    rtp = (wins_sum / bets_sum * 100) if bets_sum > 0 else 0
+    profit_total = bets_sum - wins_sum
+    profit_label = "Прибыль" if profit_total >= 0 else "Убыток"
 
     return {
-        "users": {"total": total_users, "new_24h": new_users_24h},
+        "users": {"total": row.total_users, "new_24h": row.new_users_24h},
         "bets": {
             "bets_sum": round(bets_sum / 100, 2),
             "wins_sum": round(wins_sum / 100, 2),
-            "bets_count": bets_count,
-            "wins_count": wins_count,
+            "bets_count": row.bets_count,
+            "wins_count": row.wins_count,
             "profit": round(profit_total / 100, 2),
             "profit_label": profit_label,
             "avg_multiplier": round(avg_multiplier, 2),
             "rtp": round(rtp, 2)
         },
         "gifts": {
-            "gift_count": gift_count,
-            "gift_sum": round(gift_sum / 100, 2)
+            "gift_count": row.gift_count,
+            "gift_sum": round(row.gift_sum / 100, 2)
         },
-        "games_24h": games_24h,
-        "games_all_time": games_all_time
+        # Статистика по играм за 24ч и за все время
+        "games_24h": games_dict(row, today_start_utc),
+        "games_all_time": games_dict(row)
     }
 
 
@@ -6,6 +6,7 @@ class BroadcastStates(StatesGroup):
     editing_text = State()
     editing_media = State()
     waiting_forward = State()
+    waiting_segment_promo = State()
 
     adding_button_text = State()
     adding_button_url = State()
@@ -0,0 +1,82 @@
+import asyncio
+
+
+class AdaptiveRateLimiter:
+    """
+    Лимитер скорости с AIMD-регулировкой для массовых отправок.
+
+    - каждая отправка занимает слот раз в 1/rate секунд;
+    - на TelegramRetryAfter все отправки встают на паузу retry_after секунд,
+      а скорость уменьшается в decrease_factor раз (multiplicative decrease);
+    - пока флуд-лимитов нет, скорость раз в increase_every секунд
+      растёт на increase_step, но не выше max_rate (additive increase).
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float = 1.0,
+        max_rate: float | None = None,
+        increase_step: float = 0.5,
+        increase_every: float = 5.0,
+        decrease_factor: float = 0.5,
+    ):
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate or rate)
+        self.increase_step = increase_step
+        self.increase_every = increase_every
+        self.decrease_factor = decrease_factor
+
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_change = 0.0
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    async def acquire(self, stop_event: asyncio.Event | None = None) -> bool:
+        """
+        Ждёт свой слот на отправку. С stop_event ожидание (в том числе
+        пауза после флуд-лимита) прерывается остановкой — тогда False
+        """
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            now = self._now()
+            slot = max(now, self._next_slot, self._paused_until)
+            self._next_slot = slot + 1 / self.rate
+            if slot > now:
+                await self._wait(slot - now, stop_event)
+                if stop_event is not None and stop_event.is_set():
+                    return False
+            # Пока ждали, могли поймать флуд-лимит — тогда встаём в очередь заново
+            if self._now() >= self._paused_until:
+                return True
+
+    @staticmethod
+    async def _wait(delay: float, stop_event: asyncio.Event | None):
+        if stop_event is None:
+            await asyncio.sleep(delay)
+            return
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def on_success(self):
+        now = self._now()
+        if now - self._last_change >= self.increase_every and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+            self._last_change = now
+
+    def on_retry_after(self, retry_after: float):
+        now = self._now()
+        # Параллельные воркеры ловят один и тот же флуд-лимит —
+        # снижаем скорость один раз за паузу, остальные только продлевают её
+        if now >= self._paused_until:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._paused_until = max(self._paused_until, now + retry_after)
+        self._next_slot = self._paused_until
+        self._last_change = self._paused_until
@@ -38,4 +38,36 @@ def progress_bar(current: int, total: int, length: int = 15) -> str:
     if total == 0:
         return "▱" * length
     filled = math.ceil(current / total * length)
-    return "▰" * filled + "▱" * (length - filled)
\ No newline at end of file
+    return "▰" * filled + "▱" * (length - filled)
+
+
+def broadcast_progress_text(
+    task_id: int,
+    status: str,
+    sent: int,
+    failed: int,
+    total: int,
+    speed: float,
+    eta: timedelta | None,
+) -> str:
+    """Текст живого статуса рассылки для админа"""
+    processed = sent + failed
+    percent = processed / total * 100 if total else 0
+
+    lines = [
+        f"📢 <b>Рассылка #{task_id}</b>",
+        f"{progress_bar(processed, total)} <b>{processed}/{total}</b> ({percent:.1f}%)",
+        f"✅ <b>Успешно:</b> {sent}  ❌ <b>Ошибки:</b> {failed}",
+    ]
+
+    if status == "sending":
+        lines.append(f"⚡ <b>Скорость:</b> {speed:.1f} сообщ/сек")
+        lines.append(f"⏳ <b>Осталось:</b> {format_time_delta(eta) if eta is not None else '∞'}")
+    elif status == "done":
+        lines.append("✅ <b>Рассылка завершена</b>")
+    elif status == "stopped":
+        lines.append("🛑 <b>Рассылка остановлена</b>")
+    elif status == "paused":
+        lines.append("⏸ <b>Рассылка на паузе</b> — продолжится после перезапуска бота")
+
+    return "\n".join(lines)
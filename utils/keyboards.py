@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from models.channels import Channel
 from models.broadcast_task import BroadcastTask
+from services.segments import SEGMENT_PRESETS
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 
@@ -102,6 +103,12 @@ def broadcast_constructor_kb(
                     callback_data="edit_buttons",
                 )
             ],
+            [
+                InlineKeyboardButton(
+                    text="🎯 Аудитория",
+                    callback_data="choose_segment",
+                )
+            ],
             [
                 InlineKeyboardButton(
                     text="👁️ Предпросмотр",
@@ -149,6 +156,38 @@ def broadcast_constructor_kb(
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+# =========================
+# Аудитория рассылки
+# =========================
+
+def broadcast_segment_kb() -> InlineKeyboardMarkup:
+    buttons = [
+        [
+            InlineKeyboardButton(
+                text=title,
+                callback_data=f"segment_{key}",
+            )
+        ]
+        for key, (title, _) in SEGMENT_PRESETS.items()
+    ]
+
+    buttons.append([
+        InlineKeyboardButton(
+            text="🏷️ Пришли по промо-ссылке",
+            callback_data="segment_promo",
+        )
+    ])
+
+    buttons.append([
+        InlineKeyboardButton(
+            text="⬅️ Назад к конструктору",
+            callback_data="back_constructor",
+        )
+    ])
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
 # =========================
 # Управление кнопками
 # =========================
@@ -255,21 +294,31 @@ def broadcast_active_kb(tasks: list[BroadcastTask]) -> InlineKeyboardMarkup:
 # Управление конкретной рассылкой
 # =========================
 
-def broadcast_control_kb(task_id: int) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="🛑 Остановить",
-                    callback_data=f"stop_broadcast_{task_id}",
-                    style="danger",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="⬅️ Назад к списку",
-                    callback_data="broadcast_active",
-                )
-            ],
-        ]
-    )
+def broadcast_control_kb(task_id: int, can_resume: bool = False) -> InlineKeyboardMarkup:
+    buttons = []
+
+    if can_resume:
+        buttons.append([
+            InlineKeyboardButton(
+                text="▶️ Продолжить",
+                callback_data=f"resume_broadcast_{task_id}",
+                style="success",
+            )
+        ])
+    else:
+        buttons.append([
+            InlineKeyboardButton(
+                text="🛑 Остановить",
+                callback_data=f"stop_broadcast_{task_id}",
+                style="danger",
+            )
+        ])
+
+    buttons.append([
+        InlineKeyboardButton(
+            text="⬅️ Назад к списку",
+            callback_data="broadcast_active",
+        )
+    ])
+
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
@@ -1,10 +1,9 @@
 import asyncio
 import re
 
-from playwright.async_api import async_playwright
-from jinja2 import Environment, FileSystemLoader
 import os
 from datetime import datetime
+from functools import lru_cache
 
 from db import SessionLocal
 from models.gift_catalog import GiftCatalog
@@ -12,7 +11,14 @@ from zoneinfo import ZoneInfo
 
 # Настройка Jinja2
 template_dir = os.path.join(os.path.dirname(__file__), "..", "templates")
-env = Environment(loader=FileSystemLoader(template_dir))
+
+
+@lru_cache(maxsize=1)
+def get_env():
+    """Окружение Jinja2 создаётся при первом превью, а не при старте бота"""
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(loader=FileSystemLoader(template_dir))
 
 
 
@@ -106,9 +112,12 @@ async def generate_lottery_preview(data: dict) -> bytes:
         "gift_price_stars": gift_price_cents / 100,
     }
 
-    template = env.get_template("lottery_preview.html")
+    template = get_env().get_template("lottery_preview.html")
     html_content = template.render(preview_data)
 
+    # Playwright тяжёлый и нужен только для превью розыгрыша
+    from playwright.async_api import async_playwright
+
     async with async_playwright() as p:
         browser = await p.chromium.launch()
         page = await browser.new_page(viewport={"width": 400, "height": 600})
@@ -0,0 +1,160 @@
+import bisect
+import logging
+from contextvars import ContextVar
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержки, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами LATENCY_BUCKETS"""
+
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram"):
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+
+class HandlerCall:
+    """Запросы в Bot API, сделанные одним вызовом обработчика"""
+
+    __slots__ = ("api_seconds", "api_requests")
+
+    def __init__(self):
+        self.api_seconds = 0.0
+        self.api_requests = 0
+
+
+class HandlerMetrics:
+    """Накопленные метрики обработчика с запуска процесса"""
+
+    __slots__ = ("latency", "errors", "db_seconds", "db_queries", "api_seconds", "api_requests")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.api_seconds = 0.0
+        self.api_requests = 0
+
+
+class ApiMetrics:
+    __slots__ = ("latency", "errors")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+
+
+# Вызов обработчика, в рамках которого идут запросы в Bot API
+current_call: ContextVar[HandlerCall | None] = ContextVar("current_call", default=None)
+
+# (роутер, обработчик) → метрики; роутер — модуль handlers.*, в нём один Router
+handler_metrics: dict[tuple[str, str], HandlerMetrics] = {}
+
+# Метод Bot API → метрики
+api_metrics: dict[str, ApiMetrics] = {}
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels.items()
+    )
+
+
+def _histogram(lines: list[str], name: str, histogram: Histogram, labels: str):
+    prefix = f"{labels}," if labels else ""
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram.buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+def render() -> str:
+    """Все метрики в текстовом формате Prometheus"""
+    lines: list[str] = []
+
+    handlers = sorted(handler_metrics.items())
+    routers: dict[str, Histogram] = {}
+    for (router, _), metrics in handlers:
+        routers.setdefault(router, Histogram()).merge(metrics.latency)
+
+    lines.append("# HELP bot_router_duration_seconds Время обработчиков роутера")
+    lines.append("# TYPE bot_router_duration_seconds histogram")
+    for router, histogram in sorted(routers.items()):
+        _histogram(lines, "bot_router_duration_seconds", histogram, _labels(router=router))
+
+    lines.append("# HELP bot_handler_duration_seconds Время обработчика")
+    lines.append("# TYPE bot_handler_duration_seconds histogram")
+    for (router, handler), metrics in handlers:
+        _histogram(
+            lines, "bot_handler_duration_seconds", metrics.latency,
+            _labels(router=router, handler=handler),
+        )
+
+    counters = (
+        ("bot_handler_errors_total", "Исключения обработчика", "errors"),
+        ("bot_handler_db_seconds_total", "Время обработчика в запросах к БД", "db_seconds"),
+        ("bot_handler_db_queries_total", "Запросы обработчика к БД", "db_queries"),
+        ("bot_handler_api_seconds_total", "Время обработчика в запросах к Bot API", "api_seconds"),
+        ("bot_handler_api_requests_total", "Запросы обработчика к Bot API", "api_requests"),
+    )
+    for name, help_text, attr in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for (router, handler), metrics in handlers:
+            lines.append(f"{name}{{{_labels(router=router, handler=handler)}}} {getattr(metrics, attr)}")
+
+    methods = sorted(api_metrics.items())
+    lines.append("# HELP bot_api_request_duration_seconds Время запроса к Bot API (без ожидания лимитов)")
+    lines.append("# TYPE bot_api_request_duration_seconds histogram")
+    for method, metrics in methods:
+        _histogram(lines, "bot_api_request_duration_seconds", metrics.latency, _labels(method=method))
+    lines.append("# HELP bot_api_errors_total Ошибки запросов к Bot API")
+    lines.append("# TYPE bot_api_errors_total counter")
+    for method, metrics in methods:
+        lines.append(f"bot_api_errors_total{{{_labels(method=method)}}} {metrics.errors}")
+
+    return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server():
+    """
+    Локальный HTTP-эндпоинт /metrics для Prometheus.
+    Возвращает AppRunner — его нужно закрыть при остановке.
+    """
+    # aiohttp.web нужен только при включённых метриках
+    from aiohttp import web
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, settings.metrics_host, settings.metrics_port).start()
+    logger.info("Метрики: http://%s:%s/metrics", settings.metrics_host, settings.metrics_port)
+    return runner
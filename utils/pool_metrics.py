@@ -0,0 +1,85 @@
+import bisect
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import settings
+
+# Границы корзин гистограммы ожидания соединения, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolWaitStats:
+    """Гистограмма времени ожидания соединения из пула"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait_ms: float):
+        self.buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        self.count += 1
+        self.total_ms += wait_ms
+        self.max_ms = max(self.max_ms, wait_ms)
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool, который меряет, сколько ждали соединение.
+    Долгое ожидание при checked out == pool_size + max_overflow —
+    пул мал или кто-то держит соединения слишком долго.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        self.wait_stats.observe((time.perf_counter() - started) * 1000)
+        return conn
+
+    def recreate(self):
+        # Пересоздание пула (например, после dispose) сохраняет статистику
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def pool_stats_text(pool, title: str = "Пул соединений БД") -> str:
+    """Состояние пула и гистограмма ожидания для админов (HTML)"""
+    lines = [
+        f"🗄 <b>{title}</b>",
+        "",
+        f"Размер: <b>{pool.size()}</b> (+ overflow до {settings.db_max_overflow})",
+        f"Выдано: <b>{pool.checkedout()}</b>",
+        f"Свободно: <b>{pool.checkedin()}</b>",
+        f"Overflow: <b>{max(0, pool.overflow())}</b>",
+    ]
+
+    stats = getattr(pool, "wait_stats", None)
+    if stats is None or not stats.count:
+        return "\n".join(lines)
+
+    lines += [
+        "",
+        "⏱ <b>Ожидание соединения</b>",
+        f"Выдач: {stats.count}, среднее {stats.total_ms / stats.count:.1f} мс, "
+        f"максимум {stats.max_ms:.1f} мс",
+        f"Таймаутов: <b>{stats.timeouts}</b>",
+    ]
+    lower = 0
+    for upper, hits in zip((*WAIT_BUCKETS_MS, None), stats.buckets):
+        label = f"{lower}–{upper} мс" if upper is not None else f"> {lower} мс"
+        lines.append(f"<code>{label:>13}</code> {hits}")
+        lower = upper
+    return "\n".join(lines)
@@ -0,0 +1,82 @@
+import asyncio
+import heapq
+import itertools
+from contextvars import ContextVar
+from enum import IntEnum
+
+from utils.redis_limiter import DistributedLimiter, global_limiter
+
+
+class Lane(IntEnum):
+    """Полосы исходящих запросов: меньше — важнее"""
+    INTERACTIVE = 0  # ответы пользователям
+    ADMIN = 1  # ответы админам
+    PAYMENT = 2  # уведомления об оплатах
+    BULK = 3  # рассылки
+
+
+# Полоса текущего обработчика/задачи; выставляется RateLimiterMiddleware
+# по апдейту и рассылкой для своих воркеров
+send_lane: ContextVar[Lane] = ContextVar("send_lane", default=Lane.INTERACTIVE)
+
+
+class PriorityLimiter:
+    """
+    Очередь с приоритетами перед общим лимитом бота.
+
+    Слот у нижележащего лимитера в каждый момент запрашивает только один
+    ожидающий — с самой важной полосой (внутри полосы — по очереди прихода).
+    Пока есть ответы пользователям, рассылка ждёт: ей достаётся только
+    оставшаяся ёмкость.
+    """
+
+    def __init__(self, limiter: DistributedLimiter):
+        self.limiter = limiter
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._busy = False
+
+    async def acquire(self, lane: Lane | None = None):
+        if lane is None:
+            lane = send_lane.get()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane, next(self._seq), future))
+        self._wake()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Очередь уже дошла до нас, но задачу отменили — отдаём ход дальше
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+        try:
+            await self.limiter.acquire()
+        finally:
+            self._release()
+
+    def _release(self):
+        self._busy = False
+        self._wake()
+
+    def _wake(self):
+        if self._busy:
+            return
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._busy = True
+                future.set_result(None)
+                return
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+
+# Все исходящие запросы процесса встают сюда перед общим лимитом бота
+outgoing_limiter = PriorityLimiter(global_limiter)
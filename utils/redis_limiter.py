@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+
+from aiolimiter import AsyncLimiter
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Token bucket в одном hash: tokens и ts (мс). Время берём из Redis,
+# чтобы часы разных хостов не влияли на лимит. Токен резервируется
+# сразу (баланс может уйти в минус) — скрипт возвращает, сколько
+# миллисекунд подождать до своего слота, и второй запрос не нужен.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000) - 1
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+-- Ключ живёт, пока бакет не наполнится: с отрицательным балансом
+-- резервы ещё ждут своих слотов, и пустой ключ пропустил бы лишние
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) * 1000 / rate) + 1000)
+
+if tokens >= 0 then
+    return 0
+end
+return math.ceil(-tokens * 1000 / rate)
+"""
+
+# Сколько секунд не ходим в Redis после ошибки — работаем на локальных лимитерах
+REDIS_RETRY_INTERVAL = 5
+
+_token_bucket = None
+_redis_errors: tuple[type[Exception], ...] = (OSError,)
+_redis_down_until = 0.0
+
+
+def get_token_bucket():
+    """Клиент Redis и скрипт создаются при первой отправке — импорт redis небыстрый"""
+    global _token_bucket, _redis_errors
+
+    if _token_bucket is None:
+        from redis.asyncio import Redis
+        from redis.exceptions import RedisError
+
+        client = Redis.from_url(
+            settings.redis_url,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+        )
+        _token_bucket = client.register_script(TOKEN_BUCKET_LUA)
+        _redis_errors = (RedisError, OSError)
+    return _token_bucket
+
+
+class DistributedLimiter:
+    """
+    Лимитер, общий для всех процессов бота.
+
+    Используется как AsyncLimiter: `async with limiter: ...`.
+    Бюджет — token bucket в Redis под ключом ratelimit:<key>, поэтому
+    несколько процессов с одинаковым key делят один лимит. Если Redis
+    недоступен, на REDIS_RETRY_INTERVAL секунд переходим на локальный
+    AsyncLimiter — лимит тогда снова действует в пределах процесса.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        max_rate: float,
+        time_period: float = 1,
+        fallback: AsyncLimiter | None = None,
+    ):
+        self.key = f"ratelimit:{key}"
+        self.rate = max_rate / time_period
+        self.capacity = max_rate
+        self.fallback = fallback or AsyncLimiter(max_rate, time_period)
+
+    async def acquire(self):
+        global _redis_down_until
+
+        if time.monotonic() >= _redis_down_until:
+            token_bucket = get_token_bucket()
+            try:
+                wait_ms = await token_bucket(keys=[self.key], args=[self.rate, self.capacity])
+            except _redis_errors as e:
+                _redis_down_until = time.monotonic() + REDIS_RETRY_INTERVAL
+                logger.warning("Redis недоступен для лимитера, работаем локально: %s", e)
+            else:
+                if wait_ms:
+                    await asyncio.sleep(wait_ms / 1000)
+                return
+
+        await self.fallback.acquire()
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
+
+# Общий лимит бота на все исходящие запросы — его делят и обработчики,
+# и рассылки, в том числе из соседних процессов
+global_limiter = DistributedLimiter("global", settings.bot_global_rate)
@@ -0,0 +1,116 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Списки параметров IN (...) разной длины — один и тот же запрос
+_IN_PARAMS = re.compile(r"\((?:\$\d+|\?|%\(\w+\)s)(?:, (?:\$\d+|\?|%\(\w+\)s))*\)")
+
+
+class UpdateSql:
+    """SQL одного апдейта: сколько запросов, сколько времени, какие повторялись"""
+
+    __slots__ = ("handler", "queries", "time_ms", "shapes")
+
+    def __init__(self):
+        self.handler: str | None = None
+        self.queries = 0
+        self.time_ms = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """Одинаковые запросы, выполненные не меньше порога N+1"""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= settings.sql_n_plus_one_threshold
+        ]
+
+
+class HandlerSql:
+    """Накопленная статистика обработчика с запуска процесса"""
+
+    __slots__ = ("updates", "queries", "time_ms", "max_queries", "n_plus_one")
+
+    def __init__(self):
+        self.updates = 0
+        self.queries = 0
+        self.time_ms = 0.0
+        self.max_queries = 0
+        self.n_plus_one = 0
+
+
+# SQL текущего апдейта; None — запрос не из обработчика (рассылки, фоновые задачи)
+current_sql: ContextVar[UpdateSql | None] = ContextVar("current_sql", default=None)
+
+# Обработчик → накопленная статистика
+handler_sql: dict[str, HandlerSql] = {}
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    # Хук синхронный, но greenlet SQLAlchemy несёт контекст вызывающей корутины
+    sql = current_sql.get()
+    if sql is None:
+        return
+    sql.queries += 1
+    sql.time_ms += (time.perf_counter() - started) * 1000
+    sql.shapes[_IN_PARAMS.sub("(...)", statement)] += 1
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # Упавший запрос не доходит до after_cursor_execute — снимаем его отметку
+    conn = context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+def record_update(sql: UpdateSql):
+    """Складывает SQL апдейта в статистику обработчика и пишет N+1 в лог"""
+    stats = handler_sql.setdefault(sql.handler, HandlerSql())
+    stats.updates += 1
+    stats.queries += sql.queries
+    stats.time_ms += sql.time_ms
+    stats.max_queries = max(stats.max_queries, sql.queries)
+
+    repeated = sql.repeated()
+    if repeated:
+        stats.n_plus_one += 1
+        shape, count = repeated[0]
+        logger.warning(
+            "N+1 в %s: %s запросов за апдейт (%.1f мс), повторов одного запроса: %s — %s",
+            sql.handler, sql.queries, sql.time_ms, count, " ".join(shape.split())[:200],
+        )
+
+
+def sql_stats_text(limit: int = 15) -> str:
+    """Топ обработчиков по суммарному времени в БД (HTML)"""
+    if not handler_sql:
+        return "🧮 Пока нет данных по SQL"
+
+    lines = ["🧮 <b>SQL по обработчикам</b> (с запуска)", ""]
+    top = sorted(handler_sql.items(), key=lambda item: item[1].time_ms, reverse=True)
+    for handler, stats in top[:limit]:
+        lines.append(
+            f"<code>{handler}</code>\n"
+            f"  апдейтов {stats.updates}, запросов {stats.queries} "
+            f"(в среднем {stats.queries / stats.updates:.1f}, макс {stats.max_queries}), "
+            f"{stats.time_ms / stats.updates:.1f} мс/апдейт"
+            + (f", ⚠️ N+1: {stats.n_plus_one}" if stats.n_plus_one else "")
+        )
+    return "\n".join(lines)
@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Awaitable, Callable, Coroutine, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+
+def detached_task(coro: Coroutine, name: str | None = None) -> asyncio.Task:
+    """
+    create_task с чистым контекстом. Обычный create_task копирует контекст
+    апдейта, и долгая задача, запущенная из обработчика, унаследовала бы
+    его счётчики SQL, сессий и метрик (current_sql, update_sessions,
+    current_call) — часы рассылки записались бы на один апдейт
+    """
+    return contextvars.Context().run(asyncio.create_task, coro, name=name)
+
+
+class TaskSupervisor:
+    """
+    Фоновые задачи и апдейты в обработке — для мягкой остановки процесса.
+
+    spawn() вместо asyncio.create_task для долгих задач (рассылки, воркеры).
+    shutdown(): перестаём брать новую работу, вызываем хуки остановки
+    (рассылки сохраняют курсор), ждём апдейты и задачи до дедлайна,
+    оставшиеся отменяем.
+    """
+
+    def __init__(self):
+        self.stopping = asyncio.Event()
+        self.tasks: set[asyncio.Task] = set()
+        self.updates: set[asyncio.Task] = set()
+        self._stop_hooks: list[Callable[[], Any]] = []
+        self._shutdown_done = False
+
+    @property
+    def accepting(self) -> bool:
+        return not self.stopping.is_set()
+
+    def spawn(self, coro: Coroutine, name: str | None = None) -> asyncio.Task | None:
+        if not self.accepting:
+            coro.close()
+            logger.warning("Остановка процесса: задача %s не запущена", name)
+            return None
+        task = detached_task(coro, name)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def sleep(self, delay: float) -> bool:
+        """Пауза, которую прерывает остановка процесса; True — процесс останавливается"""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        return self.stopping.is_set()
+
+    def on_stop(self, hook: Callable[[], Any]):
+        """Хук, который вызывается в начале остановки (синхронный)"""
+        self._stop_hooks.append(hook)
+
+    def stop(self):
+        """Перестать брать новую работу; безопасно вызывать из обработчика сигнала"""
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        for hook in self._stop_hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("Ошибка в хуке остановки")
+
+    async def shutdown(self, timeout: float):
+        if self._shutdown_done:
+            return
+        self._shutdown_done = True
+        self.stop()
+
+        pending = (self.tasks | self.updates) - {asyncio.current_task()}
+        if pending:
+            logger.info(
+                "Ждём %s апдейтов и %s фоновых задач (до %s сек)",
+                len(self.updates), len(self.tasks), timeout,
+            )
+            _, pending = await asyncio.wait(pending, timeout=timeout)
+
+        for task in pending:
+            logger.warning("Задача %s не успела завершиться — отменяем", task.get_name())
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+supervisor = TaskSupervisor()
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Учитывает апдейты в обработке, чтобы при остановке их дождаться.
+    Новые апдейты перестаёт брать сам источник (polling, вебхук, поток) —
+    здесь их не отбрасываем: полученный апдейт уже не придёт повторно.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        task = asyncio.current_task()
+        supervisor.updates.add(task)
+        try:
+            return await handler(event, data)
+        finally:
+            supervisor.updates.discard(task)
@@ -0,0 +1,49 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Ограниченный по размеру словарь с вытеснением по времени простоя.
+
+    Работает как defaultdict: cache[key] создаёт значение через factory.
+    Ключи лежат в OrderedDict в порядке последнего обращения, поэтому
+    и доступ, и вытеснение (протухшие по ttl или сверх maxsize) — O(1)
+    амортизированно: старые записи всегда в начале.
+    """
+
+    def __init__(self, factory: Callable[[], V], maxsize: int = 10_000, ttl: float = 600.0):
+        self.factory = factory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+
+    def __getitem__(self, key: Hashable) -> V:
+        now = time.monotonic()
+        item = self._data.get(key)
+        if item is None:
+            value = self.factory()
+        else:
+            value = item[1]
+            self._data.move_to_end(key)
+        self._data[key] = (now, value)
+        self._evict(now)
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _evict(self, now: float):
+        data = self._data
+        deadline = now - self.ttl
+        while data:
+            key, (accessed_at, _) = next(iter(data.items()))
+            if accessed_at > deadline and len(data) <= self.maxsize:
+                break
+            del data[key]
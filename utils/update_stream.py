@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import zlib
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramNetworkError, TelegramServerError
+
+from config import settings
+from utils.task_supervisor import supervisor
+
+logger = logging.getLogger(__name__)
+
+GROUP = "bot-workers"
+READ_COUNT = 50
+READ_BLOCK_MS = 5000
+# Пауза после сбоя сети / Redis: растёт вдвое до максимума
+RETRY_MIN_DELAY = 1
+RETRY_MAX_DELAY = 30
+
+
+def get_stream_redis():
+    """Отдельный клиент без таймаута чтения — XREADGROUP висит в BLOCK"""
+    from redis.asyncio import Redis
+
+    return Redis.from_url(settings.redis_url)
+
+
+def partition_of(update: Dict[str, Any]) -> int:
+    """
+    Раздел потока для апдейта: по from.id (или chat.id) — все апдейты
+    одного пользователя попадают в один раздел и идут по порядку
+    """
+    key = 0
+    for name, value in update.items():
+        if name == "update_id" or not isinstance(value, dict):
+            continue
+        user = value.get("from") or value.get("user") or value.get("chat") or {}
+        key = user.get("id", 0)
+        break
+    return zlib.crc32(str(key).encode()) % settings.stream_partitions
+
+
+def stream_key(partition: int) -> str:
+    return f"{settings.stream_prefix}:{partition}"
+
+
+def retryable_errors() -> tuple:
+    """Сбои, после которых цикл ждёт и продолжает, а не падает"""
+    from redis.exceptions import RedisError
+
+    return TelegramNetworkError, TelegramServerError, RedisError
+
+
+async def retry_pause(delay: float):
+    """Пауза перед повтором; остановка процесса её прерывает"""
+    try:
+        await asyncio.wait_for(supervisor.stopping.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def run_stream_receiver(dp: Dispatcher, bot: Bot):
+    """
+    Приёмник: long polling без обработки — сырые апдейты раскладываются
+    по разделам Redis stream. offset сдвигается только после XADD,
+    так что при падении апдейт будет получен заново, а не потерян.
+    """
+    redis = get_stream_redis()
+    errors = retryable_errors()
+    allowed_updates = dp.resolve_used_update_types()
+    offset = None
+    delay = RETRY_MIN_DELAY
+    logger.info("Приёмник апдейтов пишет в %s:* (%s разделов)", settings.stream_prefix, settings.stream_partitions)
+
+    try:
+        while supervisor.accepting:
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+                if updates:
+                    pipe = redis.pipeline(transaction=False)
+                    for update in updates:
+                        raw = update.model_dump(mode="json", exclude_none=True, by_alias=True)
+                        pipe.xadd(
+                            stream_key(partition_of(raw)),
+                            {"update": json.dumps(raw, ensure_ascii=False)},
+                            maxlen=settings.stream_maxlen,
+                            approximate=True,
+                        )
+                    await pipe.execute()
+            except errors as e:
+                # offset не сдвинут — пачка придёт заново (частично записанная
+                # пачка даст дубли в потоке, но не потерю апдейтов)
+                logger.warning("Приёмник: %r, повтор через %s сек", e, delay)
+                await retry_pause(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+                continue
+
+            delay = RETRY_MIN_DELAY
+            if updates:
+                offset = updates[-1].update_id + 1
+    finally:
+        await redis.aclose()
+
+
+async def run_stream_worker(dp: Dispatcher, bot: Bot):
+    """
+    Воркер: читает свои разделы через consumer group и прогоняет апдейты
+    через обычный диспетчер. Раздел p принадлежит воркеру
+    p % stream_workers == stream_worker_index, поэтому его читает ровно
+    один процесс, а внутри процесса — одна задача: апдейты пользователя
+    обрабатываются строго по порядку. Разделы разных пользователей идут
+    параллельно, и больше воркеров — больше разделов в работе одновременно.
+    После рестарта воркер сначала дочитывает свои неподтверждённые апдейты.
+    """
+    redis = get_stream_redis()
+    consumer = f"worker-{settings.stream_worker_index}"
+    partitions = [
+        p for p in range(settings.stream_partitions)
+        if p % settings.stream_workers == settings.stream_worker_index
+    ]
+    logger.info("Воркер %s: разделы %s", consumer, partitions)
+
+    await dp.emit_startup(bot=bot, dispatcher=dp, bots=[bot])
+    try:
+        await asyncio.gather(*(
+            consume_partition(redis, dp, bot, stream_key(p), consumer) for p in partitions
+        ))
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp, bots=[bot])
+        await redis.aclose()
+
+
+async def create_group(redis, stream: str):
+    from redis.exceptions import ResponseError
+
+    try:
+        await redis.xgroup_create(stream, GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def consume_partition(redis, dp: Dispatcher, bot: Bot, stream: str, consumer: str):
+    errors = retryable_errors()
+    group_ready = False
+    delay = RETRY_MIN_DELAY
+
+    # "0" — свои неподтверждённые после рестарта, затем ">" — новые
+    last_id = "0"
+    while supervisor.accepting:
+        try:
+            if not group_ready:
+                await create_group(redis, stream)
+                group_ready = True
+
+            response = await redis.xreadgroup(
+                GROUP, consumer, {stream: last_id}, count=READ_COUNT,
+                block=None if last_id == "0" else READ_BLOCK_MS,
+            )
+            entries = response[0][1] if response else []
+            if last_id == "0" and not entries:
+                last_id = ">"
+                continue
+
+            for entry_id, fields in entries:
+                # Остановка: необработанные записи остаются неподтверждёнными
+                # и будут дочитаны этим же consumer после рестарта
+                if not supervisor.accepting:
+                    return
+                try:
+                    await dp.feed_raw_update(bot, json.loads(fields[b"update"]))
+                except Exception:
+                    # Ошибку уже залогировал диспетчер; не застреваем на одном апдейте
+                    logger.exception("Апдейт %s из %s не обработан", entry_id, stream)
+                await redis.xack(stream, GROUP, entry_id)
+        except errors as e:
+            logger.warning("Раздел %s: %r, повтор через %s сек", stream, e, delay)
+            # Дочитываем свои неподтверждённые — в том числе запись, на которой упал XACK
+            last_id = "0"
+            await retry_pause(delay)
+            delay = min(delay * 2, RETRY_MAX_DELAY)
+            continue
+
+        delay = RETRY_MIN_DELAY
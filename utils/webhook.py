@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import settings
+from utils.task_supervisor import supervisor
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    SimpleRequestHandler с ограничением апдейтов в обработке.
+
+    Апдейт обрабатывается в фоне, Telegram сразу получает 200. Пока в работе
+    max_in_flight апдейтов, следующий запрос ждёт свободного места
+    и не отвечает — Telegram притормаживает доставку сам (не больше
+    max_connections одновременных запросов), а память и пул соединений
+    не раздуваются от тысяч фоновых задач.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_in_flight: int, **kwargs: Any):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        await self._in_flight.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            # Задача на апдейт не создана — место освобождаем сразу
+            self._in_flight.release()
+            raise
+
+    async def _background_feed_update(self, bot: Bot, update: Dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            self._in_flight.release()
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """Поднимает aiohttp-сервер под вебхук и работает до остановки процесса"""
+    app = web.Application()
+    BoundedRequestHandler(
+        dp,
+        bot,
+        max_in_flight=settings.webhook_max_in_flight,
+        secret_token=settings.webhook_secret,
+    ).register(app, path=settings.webhook_path)
+    # startup/shutdown диспетчера — вместе с сервером
+    setup_application(app, dp, bot=bot)
+
+    # Без webhook_url вебхук настроен снаружи (или это стенд)
+    if settings.webhook_url:
+        await bot.set_webhook(
+            url=settings.webhook_url.rstrip("/") + settings.webhook_path,
+            secret_token=settings.webhook_secret,
+            max_connections=settings.webhook_max_connections,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+    logger.info(
+        "Вебхук слушает %s:%s%s", settings.webhook_host, settings.webhook_port, settings.webhook_path
+    )
+
+    try:
+        await supervisor.stopping.wait()
+    finally:
+        # Сначала перестаём принимать запросы, потом дорабатываем принятые,
+        # и только потом закрываем приложение (оно закрывает и сессию бота)
+        await site.stop()
+        await supervisor.shutdown(settings.shutdown_timeout)
+        await runner.cleanup()